@@ -17,6 +17,9 @@ from auth.roles import require_role, show_role_badge, can_edit_worker, get_acces
 from database.audit import init_audit_db, log_action, get_recent_actions
 from database.workers_json import init_json_db, obtener_trabajadores, obtener_rubros, obtener_horas_trabajador, obtener_total_horas
 from notifications.inapp import init_notifications_db, get_user_notifications, get_unread_count, mark_notification_read, mark_all_read
+from database.notifications import show_notification_badge
+from notifications.sobrecargas import get_verificador_sobrecargas
+from notifications.scheduler import start_scheduler
 
 # Configuración de la página
 st.set_page_config(
@@ -67,6 +70,13 @@ def inicializar_bases_datos():
     init_audit_db()
     init_json_db()
     init_notifications_db()
+    
+    # Alertas de sobrecarga al guardar horas (eventos de este proceso)
+    get_verificador_sobrecargas().start()
+    
+    # Tareas programadas: solo las ejecuta el proceso que toma el candado
+    # de líder; los demás quedan en espera (idempotente entre sesiones)
+    start_scheduler()
     print("✅ Bases de datos inicializadas (JSON)")
 
 def main():
@@ -88,17 +98,9 @@ def main():
         # Badge de rol
         show_role_badge()
         
-        # Notificaciones
+        # Notificaciones (se consultan solo cuando llegan eventos)
         username = st.session_state.get('username', '')
-        unread_count = get_unread_count(username)
-        
-        if unread_count > 0:
-            st.markdown(f"""
-                <div style='background: #fff3cd; padding: 10px; border-radius: 5px; text-align: center; margin-bottom: 1rem;'>
-                    <span class='notification-badge'>{unread_count}</span> 
-                    <span style='color: #856404;'>notificaciones nuevas</span>
-                </div>
-            """, unsafe_allow_html=True)
+        show_notification_badge(username)
         
         # Menú según rol
         st.markdown("---")
@@ -111,7 +113,8 @@ def main():
                 "🏢 Áreas",
                 "📊 Rubros",
                 "📈 Google Sheets",
-                "📋 Auditoría"
+                "📋 Auditoría",
+                "⏱️ Tareas Programadas"
             ]
         elif st.session_state['role'] == 'supervisor':
             menu_options = [
@@ -176,6 +179,10 @@ def main():
         from pages.audit_page import show_audit_page
         show_audit_page()
     
+    elif "Tareas Programadas" in page:
+        from pages.scheduler_page import show_scheduler_page
+        show_scheduler_page()
+    
     elif "Configuración" in page:
         from pages.settings import show_settings_page
         show_settings_page()
@@ -26,6 +26,9 @@ from database.workers_json import (
 )
 
 from notifications.inapp import init_notifications_db, get_user_notifications, get_unread_count, mark_notification_read, mark_all_read
+from database.notifications import show_notification_badge
+from notifications.sobrecargas import get_verificador_sobrecargas
+from notifications.scheduler import start_scheduler
 
 # Configuración de la página
 st.set_page_config(
@@ -68,6 +71,13 @@ def inicializar_bases_datos():
     # Trabajadores ahora usa JSON
     init_json_db()
     
+    # Alertas de sobrecarga al guardar horas (eventos de este proceso)
+    get_verificador_sobrecargas().start()
+    
+    # Tareas programadas: solo las ejecuta el proceso que toma el candado
+    # de líder; los demás quedan en espera (idempotente entre sesiones)
+    start_scheduler()
+    
     print("✅ Bases de datos inicializadas (JSON + SQLite para logs)")
 
 def main():
@@ -89,17 +99,9 @@ def main():
         # Badge de rol
         show_role_badge()
         
-        # Notificaciones
+        # Notificaciones (se consultan solo cuando llegan eventos)
         username = st.session_state.get('username', '')
-        unread_count = get_unread_count(username)
-        
-        if unread_count > 0:
-            st.markdown(f"""
-                <div style='background: #fff3cd; padding: 10px; border-radius: 5px; text-align: center; margin-bottom: 1rem;'>
-                    <span class='notification-badge'>{unread_count}</span> 
-                    <span style='color: #856404;'>notificaciones nuevas</span>
-                </div>
-            """, unsafe_allow_html=True)
+        show_notification_badge(username)
         
         # Menú según rol
         st.markdown("---")
@@ -113,6 +115,7 @@ def main():
                 "📈 Google Sheets",
                 "🔔 Notificaciones",
                 "📋 Auditoría",
+                "⏱️ Tareas Programadas",
                 "⚙️ Configuración"
             ]
         elif st.session_state['role'] == 'supervisor':
@@ -176,6 +179,10 @@ def main():
         from pages.audit_page import show_audit_page
         show_audit_page()
     
+    elif "Tareas Programadas" in page:
+        from pages.scheduler_page import show_scheduler_page
+        show_scheduler_page()
+    
     elif "Configuración" in page:
         from pages.settings import show_settings_page
         show_settings_page()
@@ -0,0 +1,88 @@
+"""
+Herramientas de línea de comandos para la auditoría
+
+Uso:
+    python auditoria_cli.py archivar [--meses-activos 3] [--comprimir-despues 6]
+    python auditoria_cli.py limpiar [--dias 90]
+    python auditoria_cli.py reconstruir-stats
+    python auditoria_cli.py exportar salida.csv [--desde 2024-01-01] [--hasta 2024-03-31]
+                                                [--usuario admin] [--accion UPDATE]
+                                                [--formato csv|parquet]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar path del proyecto
+sys.path.insert(0, str(Path(__file__).parent))
+
+def cmd_archivar(args):
+    """Mover meses antiguos a particiones mensuales"""
+    from database.audit_archive import archivar_meses
+    
+    movidas = archivar_meses(args.meses_activos, args.comprimir_despues)
+    print(f"✅ {sum(movidas.values())} registros archivados en {len(movidas)} particiones")
+
+def cmd_limpiar(args):
+    """Eliminar auditoría más antigua que N días"""
+    from database.audit_core import clear_old_logs
+    
+    eliminados = clear_old_logs(args.dias)
+    print(f"✅ {eliminados} registros eliminados")
+
+def cmd_reconstruir_stats(args):
+    """Recalcular el resumen diario de acciones (backfill)"""
+    from database.audit_core import init_audit_db, rebuild_audit_stats
+    
+    init_audit_db()
+    filas = rebuild_audit_stats()
+    print(f"✅ Resumen reconstruido: {filas} filas (día, usuario, acción)")
+
+def cmd_exportar(args):
+    """Exportar la auditoría del rango a CSV o Parquet por lotes"""
+    from database.audit_export import exportar_auditoria
+    
+    formato = args.formato or ('parquet' if args.salida.endswith('.parquet') else 'csv')
+    filters = {
+        'date_from': args.desde,
+        'date_to': args.hasta,
+        'username': args.usuario,
+        'action': args.accion,
+    }
+    filas = exportar_auditoria(args.salida, formato, filters, args.lote)
+    print(f"✅ {filas} registros exportados a {args.salida}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Herramientas de auditoría")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    
+    archivar = subparsers.add_parser('archivar', help="Archivar meses antiguos en particiones")
+    archivar.add_argument('--meses-activos', type=int, default=3,
+                          help="Meses (incluido el actual) que quedan en la tabla activa")
+    archivar.add_argument('--comprimir-despues', type=int, default=6,
+                          help="Antigüedad en meses a partir de la cual se comprime")
+    archivar.set_defaults(func=cmd_archivar)
+    
+    limpiar = subparsers.add_parser('limpiar', help="Eliminar registros antiguos")
+    limpiar.add_argument('--dias', type=int, default=90)
+    limpiar.set_defaults(func=cmd_limpiar)
+    
+    stats = subparsers.add_parser('reconstruir-stats', help="Recalcular el resumen diario de acciones")
+    stats.set_defaults(func=cmd_reconstruir_stats)
+    
+    exportar = subparsers.add_parser('exportar', help="Exportar auditoría a CSV o Parquet")
+    exportar.add_argument('salida', help="Archivo de salida")
+    exportar.add_argument('--formato', choices=['csv', 'parquet'],
+                          help="Por defecto según la extensión de la salida")
+    exportar.add_argument('--desde', help="Fecha inicial YYYY-MM-DD (incluida)")
+    exportar.add_argument('--hasta', help="Fecha final YYYY-MM-DD (incluida)")
+    exportar.add_argument('--usuario')
+    exportar.add_argument('--accion')
+    exportar.add_argument('--lote', type=int, default=5000, help="Filas por lote")
+    exportar.set_defaults(func=cmd_exportar)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark del log de auditoría
+
+Genera un log sintético en una base temporal y compara los filtros
+antiguos (DATE(timestamp), sin índices) con los actuales (rangos ISO
+semiabiertos sobre índices).
+
+Con --tamano compara en cambio el espacio que ocupan old_value/new_value
+completos frente al diff con blobs de database.audit_core.compactar_valores.
+
+Uso:
+    python benchmark_auditoria.py                  # 5.000.000 filas
+    python benchmark_auditoria.py --filas 500000
+    python benchmark_auditoria.py --tamano --filas 20000
+"""
+import argparse
+import base64
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+USUARIOS = [f'usuario{i}' for i in range(50)]
+ACCIONES = ['CREATE', 'UPDATE', 'DELETE', 'LOGIN', 'LOGOUT', 'IMPORT', 'EXPORT']
+TABLAS = ['trabajadores', 'rubros', 'horas_asignadas', 'users']
+
+def generar_log(conn, filas, dias=365):
+    """Insertar `filas` registros repartidos en los últimos `dias` días"""
+    conn.execute('''
+        CREATE TABLE audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            username TEXT NOT NULL,
+            user_role TEXT NOT NULL,
+            action TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            record_id INTEGER,
+            old_value TEXT,
+            new_value TEXT,
+            details TEXT
+        )
+    ''')
+
+    inicio = datetime.now() - timedelta(days=dias)
+    paso = dias * 86400 / filas
+    rnd = random.Random(42)
+
+    def registros():
+        for i in range(filas):
+            yield (
+                (inicio + timedelta(seconds=i * paso)).isoformat(),
+                rnd.choice(USUARIOS),
+                'admin',
+                rnd.choice(ACCIONES),
+                rnd.choice(TABLAS),
+                rnd.randint(1, 5000),
+                None,
+                None,
+                'registro sintético'
+            )
+
+    with conn:
+        conn.executemany('''
+            INSERT INTO audit_log
+            (timestamp, username, user_role, action, table_name, record_id, old_value, new_value, details)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', registros())
+
+def crear_indices(conn):
+    """Los mismos índices que crea database.audit_core.init_audit_db"""
+    conn.execute('CREATE INDEX idx_audit_timestamp ON audit_log(timestamp)')
+    conn.execute('CREATE INDEX idx_audit_username_ts ON audit_log(username, timestamp)')
+    conn.execute('CREATE INDEX idx_audit_action_ts ON audit_log(action, timestamp)')
+    conn.execute('ANALYZE')
+
+def medir(conn, query, params, repeticiones=5):
+    """Mejor tiempo (ms) de `repeticiones` ejecuciones"""
+    mejor = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        ms = (time.perf_counter() - t0) * 1000
+        mejor = ms if mejor is None else min(mejor, ms)
+    return mejor
+
+def consultas():
+    """Pares (nombre, consulta antigua, consulta nueva) con sus parámetros"""
+    hoy = datetime.now().date()
+    ayer = (hoy - timedelta(days=1)).isoformat()
+    hace_30 = (hoy - timedelta(days=30)).isoformat()
+    manana = (hoy + timedelta(days=1)).isoformat()
+    limite_90 = (hoy - timedelta(days=90)).isoformat()
+
+    return [
+        (
+            'Página de auditoría: ayer + acción',
+            "SELECT * FROM audit_log WHERE action = ? AND DATE(timestamp) >= ? AND DATE(timestamp) <= ? "
+            "ORDER BY timestamp DESC LIMIT 500",
+            ['UPDATE', ayer, ayer],
+            "SELECT * FROM audit_log WHERE action = ? AND timestamp >= ? AND timestamp < ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            ['UPDATE', ayer, hoy.isoformat(), 500],
+        ),
+        (
+            'Usuario, últimos 30 días',
+            "SELECT * FROM audit_log WHERE username = ? AND DATE(timestamp) >= ? AND DATE(timestamp) <= ? "
+            "ORDER BY timestamp DESC LIMIT 500",
+            ['usuario7', hace_30, hoy.isoformat()],
+            "SELECT * FROM audit_log WHERE username = ? AND timestamp >= ? AND timestamp < ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            ['usuario7', hace_30, manana, 500],
+        ),
+        (
+            'clear_old_logs(90) (conteo)',
+            "SELECT COUNT(*) FROM audit_log WHERE DATE(timestamp) < DATE(?)",
+            [limite_90],
+            "SELECT COUNT(*) FROM audit_log WHERE timestamp < ?",
+            [limite_90],
+        ),
+    ]
+
+def actualizaciones(filas, trabajadores=200):
+    """Pares (old, new) de actualizaciones de trabajadores con foto base64"""
+    rnd = random.Random(42)
+    estado = {}
+    for i in range(trabajadores):
+        estado[i] = {
+            'nombre': f'Trabajador {i}',
+            'email': f'trabajador{i}@empresa.com',
+            'telefono': f'555{i:07d}',
+            'area': rnd.choice(['Ventas', 'Operaciones', 'Sistemas', 'RRHH']),
+            'foto': 'data:image/jpeg;base64,' + base64.b64encode(rnd.randbytes(24_000)).decode(),
+            'estatus': 'activo'
+        }
+
+    for _ in range(filas):
+        i = rnd.randrange(trabajadores)
+        old = estado[i]
+        new = dict(old)
+        if rnd.random() < 0.1:
+            new['foto'] = 'data:image/jpeg;base64,' + base64.b64encode(rnd.randbytes(24_000)).decode()
+        else:
+            new[rnd.choice(['area', 'telefono'])] = f'cambio {rnd.randrange(10_000)}'
+        estado[i] = new
+        yield old, new
+
+def tamano_base(conn):
+    """Bytes ocupados por la base tras VACUUM"""
+    conn.execute('VACUUM')
+    paginas = conn.execute('PRAGMA page_count').fetchone()[0]
+    return paginas * conn.execute('PRAGMA page_size').fetchone()[0]
+
+def benchmark_tamano(filas, tmp):
+    """Tamaño del log con valores completos frente a diff + blobs"""
+    from database.audit_core import compactar_valores, INSERT_BLOB_SQL
+
+    completa = sqlite3.connect(str(Path(tmp) / 'completa.db'))
+    compacta = sqlite3.connect(str(Path(tmp) / 'compacta.db'))
+    for conn in (completa, compacta):
+        conn.execute('CREATE TABLE audit_log (id INTEGER PRIMARY KEY, old_value TEXT, new_value TEXT)')
+    compacta.execute('CREATE TABLE audit_blobs (hash TEXT PRIMARY KEY, data TEXT NOT NULL)')
+
+    with completa, compacta:
+        for old, new in actualizaciones(filas):
+            completa.execute(
+                'INSERT INTO audit_log (old_value, new_value) VALUES (?, ?)',
+                (json.dumps(old, ensure_ascii=False), json.dumps(new, ensure_ascii=False))
+            )
+            old_json, new_json, blobs = compactar_valores(old, new)
+            compacta.executemany(INSERT_BLOB_SQL, blobs.items())
+            compacta.execute('INSERT INTO audit_log (old_value, new_value) VALUES (?, ?)', (old_json, new_json))
+
+    antes = tamano_base(completa)
+    ahora = tamano_base(compacta)
+    blobs = compacta.execute('SELECT COUNT(*) FROM audit_blobs').fetchone()[0]
+    completa.close()
+    compacta.close()
+
+    print(f"{'Valores completos':<38} {antes / 1e6:>10.1f} MB")
+    print(f"{'Diff + blobs':<38} {ahora / 1e6:>10.1f} MB  ({blobs} blobs)")
+    print(f"{'Reducción':<38} {antes / ahora:>10.0f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de filtros del log de auditoría")
+    parser.add_argument('--filas', type=int, default=5_000_000)
+    parser.add_argument('--tamano', action='store_true',
+                        help="Medir el tamaño de old_value/new_value en lugar de los filtros")
+    args = parser.parse_args()
+
+    if args.tamano:
+        with tempfile.TemporaryDirectory() as tmp:
+            print("=" * 70)
+            print(f"BENCHMARK TAMAÑO AUDITORÍA - {args.filas:,} actualizaciones")
+            print("=" * 70)
+            benchmark_tamano(args.filas, tmp)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(str(Path(tmp) / 'bench_auditoria.db'))
+
+        print("=" * 70)
+        print(f"BENCHMARK AUDITORÍA - {args.filas:,} filas")
+        print("=" * 70)
+
+        t0 = time.perf_counter()
+        generar_log(conn, args.filas)
+        print(f"Log sintético generado en {time.perf_counter() - t0:.1f}s")
+
+        casos = consultas()
+        antes = [medir(conn, q_old, p_old, repeticiones=2) for _, q_old, p_old, _, _ in casos]
+
+        t0 = time.perf_counter()
+        crear_indices(conn)
+        print(f"Índices creados en {time.perf_counter() - t0:.1f}s\n")
+
+        print(f"{'Consulta':<38} {'Antes (ms)':>12} {'Ahora (ms)':>12} {'Mejora':>8}")
+        for (nombre, _, _, q_new, p_new), ms_antes in zip(casos, antes):
+            ms_ahora = medir(conn, q_new, p_new)
+            print(f"{nombre:<38} {ms_antes:>12.1f} {ms_ahora:>12.1f} {ms_antes / ms_ahora:>7.0f}x")
+
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Archivo de auditoría particionado por mes
+
+La tabla `audit_log` de auditoria.db guarda solo los meses recientes.
+archivar_meses() mueve cada mes anterior a su propio archivo SQLite
+(auditoria_archivo/audit_YYYY-MM.db) y, pasado un tiempo, lo comprime
+(audit_YYYY-MM.db.gz). Las consultas de database.audit_core recorren solo las
+particiones que caen dentro del rango pedido, y la retención pasa a ser
+borrar archivos en lugar de un DELETE masivo.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import date
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent.parent / 'auditoria.db'
+ARCHIVE_DIR = Path(__file__).parent.parent / 'auditoria_archivo'
+CACHE_DIR = Path(tempfile.gettempdir()) / 'gestion_horas_auditoria'
+
+def _mes_siguiente(mes):
+    """'YYYY-MM' → 'YYYY-MM' del mes siguiente"""
+    año, m = int(mes[:4]), int(mes[5:7])
+    return f"{año + m // 12:04d}-{m % 12 + 1:02d}"
+
+def _restar_meses(mes, n):
+    """'YYYY-MM' menos n meses"""
+    total = int(mes[:4]) * 12 + int(mes[5:7]) - 1 - n
+    return f"{total // 12:04d}-{total % 12 + 1:02d}"
+
+def _ruta(mes, comprimida=False):
+    return ARCHIVE_DIR / (f"audit_{mes}.db.gz" if comprimida else f"audit_{mes}.db")
+
+def particiones(desde=None, hasta=None):
+    """
+    Particiones archivadas que se solapan con el rango [desde, hasta]
+    
+    Args:
+        desde: fecha/timestamp ISO inicial (incluida) o None
+        hasta: fecha/timestamp ISO final (incluida) o None
+    
+    Returns:
+        Lista de meses 'YYYY-MM', del más reciente al más antiguo
+    """
+    if not ARCHIVE_DIR.exists():
+        return []
+    
+    meses = set()
+    for archivo in ARCHIVE_DIR.glob('audit_*.db*'):
+        mes = archivo.name[len('audit_'):len('audit_') + 7]
+        if desde and mes < str(desde)[:7]:
+            continue
+        if hasta and mes > str(hasta)[:7]:
+            continue
+        meses.add(mes)
+    
+    return sorted(meses, reverse=True)
+
+def ruta_consultable(mes):
+    """
+    Ruta de un archivo SQLite legible para la partición del mes
+    
+    Las particiones comprimidas se descomprimen una vez en CACHE_DIR y se
+    reutilizan mientras el .gz no cambie. La copia se escribe en un archivo
+    temporal del mismo directorio y se renombra al terminar, así otra sesión
+    nunca abre una copia a medio escribir.
+    """
+    ruta = _ruta(mes)
+    if ruta.exists():
+        return ruta
+    
+    comprimida = _ruta(mes, comprimida=True)
+    if not comprimida.exists():
+        return None
+    
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache = CACHE_DIR / ruta.name
+    if not cache.exists() or cache.stat().st_mtime < comprimida.stat().st_mtime:
+        temporal = tempfile.NamedTemporaryFile(dir=CACHE_DIR, prefix=cache.name, suffix='.tmp', delete=False)
+        try:
+            with temporal as destino, gzip.open(comprimida, 'rb') as origen:
+                shutil.copyfileobj(origen, destino)
+            os.replace(temporal.name, cache)
+        except BaseException:
+            Path(temporal.name).unlink(missing_ok=True)
+            raise
+    return cache
+
+def ruta_editable(mes):
+    """Ruta de la partición del mes si está sin comprimir, si no None"""
+    ruta = _ruta(mes)
+    return ruta if ruta.exists() else None
+
+def _comprimir(mes):
+    """Comprimir la partición del mes (audit_YYYY-MM.db → .db.gz)"""
+    ruta = _ruta(mes)
+    with open(ruta, 'rb') as origen, gzip.open(_ruta(mes, comprimida=True), 'wb') as destino:
+        shutil.copyfileobj(origen, destino)
+    ruta.unlink()
+
+def _descomprimir(mes):
+    """Devolver una partición comprimida a su forma editable"""
+    comprimida = _ruta(mes, comprimida=True)
+    with gzip.open(comprimida, 'rb') as origen, open(_ruta(mes), 'wb') as destino:
+        shutil.copyfileobj(origen, destino)
+    comprimida.unlink()
+
+def _crear_particion(conn, mes):
+    """Adjuntar (y crear si no existe) la partición con el esquema de audit_log"""
+    if _ruta(mes, comprimida=True).exists():
+        _descomprimir(mes)
+    
+    nueva = not _ruta(mes).exists()
+    conn.execute("ATTACH DATABASE ? AS particion", (str(_ruta(mes)),))
+    
+    if nueva:
+        esquema = conn.execute("""
+            SELECT sql FROM main.sqlite_master
+            WHERE tbl_name = 'audit_log' AND sql IS NOT NULL
+            ORDER BY type DESC
+        """).fetchall()
+        for (sql,) in esquema:
+            # Mismas sentencias, creadas dentro de la base adjunta
+            sql = sql.replace('CREATE TABLE audit_log', 'CREATE TABLE particion.audit_log', 1)
+            if sql.startswith('CREATE INDEX '):
+                sql = sql.replace('CREATE INDEX ', 'CREATE INDEX particion.', 1)
+            conn.execute(sql)
+
+def archivar_meses(meses_activos=3, comprimir_despues=6, db_path=None):
+    """
+    Mover los meses antiguos de audit_log a particiones mensuales
+    
+    Args:
+        meses_activos: meses (incluido el actual) que se quedan en audit_log
+        comprimir_despues: antigüedad en meses a partir de la cual se comprime
+        db_path: base con la tabla activa (por defecto auditoria.db)
+    
+    Returns:
+        Dict {mes: filas movidas}
+    """
+    meses_activos = max(1, meses_activos)
+    mes_actual = date.today().isoformat()[:7]
+    corte = _restar_meses(mes_actual, meses_activos - 1)
+    
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path or DB_PATH), timeout=30)
+    movidas = {}
+    
+    try:
+        minimo = conn.execute("SELECT MIN(timestamp) FROM audit_log").fetchone()[0]
+        mes = minimo[:7] if minimo else corte
+        
+        while mes < corte:
+            inicio, fin = mes, _mes_siguiente(mes)
+            hay_filas = conn.execute(
+                "SELECT 1 FROM audit_log WHERE timestamp >= ? AND timestamp < ? LIMIT 1",
+                (inicio, fin)
+            ).fetchone()
+            
+            if hay_filas:
+                _crear_particion(conn, mes)
+                with conn:
+                    c = conn.execute("""
+                        INSERT INTO particion.audit_log
+                        SELECT * FROM main.audit_log WHERE timestamp >= ? AND timestamp < ?
+                    """, (inicio, fin))
+                    movidas[mes] = c.rowcount
+                    conn.execute(
+                        "DELETE FROM main.audit_log WHERE timestamp >= ? AND timestamp < ?",
+                        (inicio, fin)
+                    )
+                conn.execute("DETACH DATABASE particion")
+                print(f"📦 Auditoría {mes}: {movidas[mes]} registros archivados")
+            
+            mes = _mes_siguiente(mes)
+    finally:
+        conn.close()
+    
+    # Comprimir las particiones frías
+    limite_frio = _restar_meses(mes_actual, comprimir_despues)
+    for mes in particiones():
+        if mes < limite_frio and _ruta(mes).exists():
+            _comprimir(mes)
+            print(f"🗜️ Auditoría {mes}: partición comprimida")
+    
+    return movidas
+
+def recortar_particion(antes_de):
+    """
+    Borrar las filas anteriores a la fecha dentro de la partición de su mes
+    
+    Es la partición que queda a caballo del límite de retención; si está
+    comprimida se descomprime, se recorta y se vuelve a comprimir.
+    
+    Args:
+        antes_de: fecha ISO límite
+    
+    Returns:
+        Filas borradas
+    """
+    mes = str(antes_de)[:7]
+    comprimida = _ruta(mes, comprimida=True).exists()
+    if comprimida:
+        _descomprimir(mes)
+    if not _ruta(mes).exists():
+        return 0
+    
+    conn = sqlite3.connect(str(_ruta(mes)), timeout=30)
+    try:
+        with conn:
+            borradas = conn.execute(
+                "DELETE FROM audit_log WHERE timestamp < ?", (str(antes_de),)
+            ).rowcount
+    finally:
+        conn.close()
+    
+    if comprimida:
+        _comprimir(mes)
+        # La copia descomprimida quedó vieja
+        (CACHE_DIR / _ruta(mes).name).unlink(missing_ok=True)
+    return borradas
+
+def eliminar_particiones(antes_de):
+    """
+    Eliminar las particiones cuyo mes termina antes de la fecha dada
+    
+    Args:
+        antes_de: fecha ISO; se borran los meses completamente anteriores
+    
+    Returns:
+        Lista de meses eliminados
+    """
+    eliminadas = []
+    for mes in particiones():
+        if _mes_siguiente(mes) <= str(antes_de)[:7]:
+            for ruta in (_ruta(mes), _ruta(mes, comprimida=True), CACHE_DIR / _ruta(mes).name):
+                if ruta.exists():
+                    ruta.unlink()
+            eliminadas.append(mes)
+    return eliminadas
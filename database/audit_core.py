@@ -0,0 +1,873 @@
+"""
+Núcleo del sistema de auditoría, sin dependencias de Streamlit
+
+Lo usan el scheduler, los scripts de línea de comandos y las
+importaciones en lote. El usuario que realiza las acciones (actor) se
+toma de un contexto explícito (set_actor / actor) en lugar de
+st.session_state; database.audit es el adaptador para las páginas.
+pandas se importa solo en las funciones que devuelven DataFrames.
+"""
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, date, timedelta
+import json
+import hashlib
+import re
+from pathlib import Path
+from database import audit_archive
+import atexit
+from collections import Counter
+import os
+import queue
+import threading
+import time
+
+DB_PATH = Path(__file__).parent.parent / 'auditoria.db'
+
+# Escritura en lote: cada AUDIT_BATCH_SIZE registros o AUDIT_FLUSH_MS milisegundos
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_MS = int(os.getenv('AUDIT_FLUSH_MS', '250'))
+AUDIT_QUEUE_MAX = int(os.getenv('AUDIT_QUEUE_MAX', '10000'))
+# AUDIT_SYNC=1 escribe cada registro en el acto (tests, scripts)
+AUDIT_SYNC = os.getenv('AUDIT_SYNC', '0') == '1'
+# Textos de este tamaño o más (p. ej. fotos base64) se guardan una vez en audit_blobs
+AUDIT_BLOB_MIN = int(os.getenv('AUDIT_BLOB_MIN', '1024'))
+
+INSERT_AUDIT_SQL = '''
+    INSERT INTO audit_log 
+    (timestamp, username, user_role, action, table_name, record_id, old_value, new_value, details)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPSERT_STATS_SQL = '''
+    INSERT INTO audit_stats_daily (dia, username, action, count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (dia, username, action) DO UPDATE SET count = count + excluded.count
+'''
+
+INSERT_BLOB_SQL = 'INSERT OR IGNORE INTO audit_blobs (hash, data) VALUES (?, ?)'
+# Referencia a un blob dentro del JSON de old_value/new_value
+BLOB_REF_RE = re.compile(r'"\$blob":\s*"([0-9a-f]{64})"')
+
+# ==================== ACTOR Y ERRORES ====================
+
+# (username, role) de quien ejecuta las acciones en el hilo/tarea actual
+_actor = ContextVar('audit_actor', default=('system', 'system'))
+
+# Función que muestra los errores (el adaptador de Streamlit usa st.error)
+_error_handler = None
+
+def set_actor(username, role):
+    """Fijar el actor del contexto actual; devuelve un token para reset_actor"""
+    return _actor.set((username, role))
+
+def reset_actor(token):
+    """Restaurar el actor anterior a set_actor"""
+    _actor.reset(token)
+
+def get_actor():
+    """(username, role) del contexto actual"""
+    return _actor.get()
+
+@contextmanager
+def actor(username, role):
+    """
+    Registrar acciones a nombre de otro actor dentro de un bloque
+    
+    Ejemplo:
+        with actor('scheduler', 'system'):
+            log_action('ARCHIVE', 'audit_log', details='...')
+    """
+    token = set_actor(username, role)
+    try:
+        yield
+    finally:
+        reset_actor(token)
+
+def set_error_handler(handler):
+    """Definir cómo se muestran los errores (None = print)"""
+    global _error_handler
+    _error_handler = handler
+
+def _reportar_error(mensaje):
+    if _error_handler:
+        _error_handler(mensaje)
+    else:
+        print(f"❌ {mensaje}")
+
+def init_audit_db():
+    """Inicializar base de datos de auditoría"""
+    conn = sqlite3.connect(str(DB_PATH))
+    c = conn.cursor()
+    
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            username TEXT NOT NULL,
+            user_role TEXT NOT NULL,
+            action TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            record_id INTEGER,
+            old_value TEXT,
+            new_value TEXT,
+            details TEXT
+        )
+    ''')
+    
+    # Índices para filtros por rango de fechas, usuario y acción
+    c.execute('CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log(timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_audit_username_ts ON audit_log(username, timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_audit_action_ts ON audit_log(action, timestamp)')
+    # Historial de un registro (get_record_history)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_audit_record_ts ON audit_log(table_name, record_id, timestamp)')
+    
+    # Resumen de acciones por (día, usuario, acción), mantenido por AuditWriter
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_stats_daily'")
+    stats_existente = c.fetchone() is not None
+    
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS audit_stats_daily (
+            dia TEXT NOT NULL,
+            username TEXT NOT NULL,
+            action TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, username, action)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_audit_stats_user ON audit_stats_daily(username, action)')
+    
+    # Valores grandes referenciados desde old_value/new_value como {"$blob": sha256}
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS audit_blobs (
+            hash TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        )
+    ''')
+    
+    conn.commit()
+    conn.close()
+    
+    # Particiones sin comprimir archivadas antes de existir el índice por registro
+    for mes in audit_archive.particiones():
+        ruta = audit_archive.ruta_editable(mes)
+        if ruta:
+            particion = sqlite3.connect(str(ruta))
+            particion.execute('CREATE INDEX IF NOT EXISTS idx_audit_record_ts ON audit_log(table_name, record_id, timestamp)')
+            particion.close()
+    
+    # Bases existentes: calcular el resumen a partir del log
+    if not stats_existente:
+        rebuild_audit_stats()
+
+def _conteos_stats(lote):
+    """Filas (dia, username, action, count) para UPSERT_STATS_SQL a partir de registros de auditoría"""
+    conteos = Counter((r[0][:10], r[1], r[3]) for r in lote)
+    return [(dia, username, action, n) for (dia, username, action), n in conteos.items()]
+
+def rebuild_audit_stats():
+    """
+    Recalcular audit_stats_daily desde la tabla activa y los meses archivados
+    
+    Se hace en una transacción IMMEDIATE, así que las escrituras de
+    AuditWriter esperan y no se cuentan dos veces ni se pierden.
+    
+    Returns:
+        Cantidad de filas del resumen
+    """
+    query = """
+        SELECT substr(timestamp, 1, 10), username, action, COUNT(*)
+        FROM audit_log
+        GROUP BY 1, 2, 3
+    """
+    
+    conn = sqlite3.connect(str(DB_PATH), timeout=30, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM audit_stats_daily")
+        
+        for ruta in _fuentes_auditoria():
+            if ruta == DB_PATH:
+                filas = conn.execute(query).fetchall()
+            else:
+                particion = sqlite3.connect(str(ruta))
+                filas = particion.execute(query).fetchall()
+                particion.close()
+            conn.executemany(UPSERT_STATS_SQL, filas)
+        
+        total = conn.execute("SELECT COUNT(*) FROM audit_stats_daily").fetchone()[0]
+        conn.execute("COMMIT")
+        return total
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+class AuditWriter:
+    """
+    Escritor de auditoría en segundo plano
+    
+    log_action solo encola el registro; un hilo lo inserta junto con los
+    demás en una única transacción cada `batch_size` registros o cada
+    `flush_ms` milisegundos. Con `sync=True` escribe en el acto.
+    """
+    
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_ms=AUDIT_FLUSH_MS,
+                 max_queue=AUDIT_QUEUE_MAX, sync=AUDIT_SYNC):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.sync = sync
+        self.queue = queue.Queue(maxsize=max_queue)
+        
+        # Blobs pendientes de los registros encolados {hash: texto}
+        self._blobs = {}
+        
+        # Contadores
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def submit(self, registro, blobs=None):
+        """Encolar un registro (tupla en el orden de INSERT_AUDIT_SQL) y sus blobs"""
+        if blobs:
+            with self._lock:
+                self._blobs.update(blobs)
+        
+        if self.sync:
+            self.write_batch([registro])
+            return True
+        
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(registro)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+    
+    def write_batch(self, lote):
+        """Insertar un lote de registros, sus blobs y su resumen en una sola transacción"""
+        with self._lock:
+            blobs, self._blobs = self._blobs, {}
+        
+        conn = sqlite3.connect(str(DB_PATH), timeout=30)
+        try:
+            with conn:
+                conn.executemany(INSERT_BLOB_SQL, blobs.items())
+                conn.executemany(INSERT_AUDIT_SQL, lote)
+                conn.executemany(UPSERT_STATS_SQL, _conteos_stats(lote))
+        finally:
+            conn.close()
+        
+        with self._lock:
+            self.written += len(lote)
+            self.batches += 1
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop_event.clear()
+                    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                    self._thread.start()
+    
+    def _run(self):
+        while not (self._stop_event.is_set() and self.queue.empty()):
+            try:
+                lote = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            
+            # Completar el lote hasta batch_size o hasta que venza el intervalo
+            limite = time.monotonic() + self.flush_interval
+            while len(lote) < self.batch_size:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self.queue.get(timeout=restante))
+                except queue.Empty:
+                    break
+            
+            try:
+                self.write_batch(lote)
+            except Exception as e:
+                print(f"❌ Error escribiendo lote de auditoría ({len(lote)} registros): {e}")
+                with self._lock:
+                    self.dropped += len(lote)
+            finally:
+                for _ in lote:
+                    self.queue.task_done()
+    
+    def flush(self, timeout=None):
+        """Esperar a que se escriban los registros encolados"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(restante)
+        return True
+    
+    def close(self, timeout=5):
+        """Vaciar la cola y detener el hilo (se llama al salir del proceso)"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+    
+    def stats(self):
+        """Contadores del escritor"""
+        with self._lock:
+            return {
+                'mode': 'sync' if self.sync else 'async',
+                'queue_depth': self.queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'batches': self.batches
+            }
+
+# Singleton global
+_writer_instance = None
+
+def get_audit_writer():
+    """Obtener el escritor de auditoría (singleton)"""
+    global _writer_instance
+    if _writer_instance is None:
+        _writer_instance = AuditWriter()
+        atexit.register(_writer_instance.close)
+    return _writer_instance
+
+def flush_audit_log(timeout=None):
+    """Forzar la escritura de los registros pendientes"""
+    return get_audit_writer().flush(timeout)
+
+# ==================== VALORES COMPACTOS ====================
+
+def diff_valores(old, new):
+    """
+    Diferencia estructural entre dos valores
+    
+    Para dos dicts devuelve solo las claves que cambian (recursivo en dicts
+    anidados): una clave que solo está en el lado antiguo se eliminó y una
+    que solo está en el nuevo se agregó. Cualquier otro par se guarda
+    completo.
+    
+    Returns:
+        (old compacto, new compacto)
+    """
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return old, new
+    
+    antes, despues = {}, {}
+    for clave in list(old) + [k for k in new if k not in old]:
+        if clave not in new:
+            antes[clave] = old[clave]
+        elif clave not in old:
+            despues[clave] = new[clave]
+        elif old[clave] != new[clave]:
+            antes[clave], despues[clave] = diff_valores(old[clave], new[clave])
+    return antes, despues
+
+def _extraer_blobs(valor, blobs):
+    """Reemplazar textos grandes por {"$blob": sha256}, acumulándolos en `blobs`"""
+    if isinstance(valor, str) and len(valor) >= AUDIT_BLOB_MIN:
+        clave = hashlib.sha256(valor.encode('utf-8')).hexdigest()
+        blobs[clave] = valor
+        return {'$blob': clave}
+    if isinstance(valor, dict):
+        return {k: _extraer_blobs(v, blobs) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_extraer_blobs(v, blobs) for v in valor]
+    return valor
+
+def compactar_valores(old_value, new_value):
+    """
+    Codificar old/new como los guarda log_action
+    
+    Returns:
+        (old JSON o None, new JSON o None, {hash: texto} de blobs)
+    """
+    old_value, new_value = diff_valores(old_value, new_value)
+    blobs = {}
+    old_value = _extraer_blobs(old_value, blobs)
+    new_value = _extraer_blobs(new_value, blobs)
+    return (
+        json.dumps(old_value, ensure_ascii=False) if old_value else None,
+        json.dumps(new_value, ensure_ascii=False) if new_value else None,
+        blobs
+    )
+
+def _expandir_blobs(valor, conn):
+    if isinstance(valor, dict):
+        if set(valor) == {'$blob'}:
+            fila = conn.execute("SELECT data FROM audit_blobs WHERE hash = ?", (valor['$blob'],)).fetchone()
+            return fila[0] if fila else valor
+        return {k: _expandir_blobs(v, conn) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_expandir_blobs(v, conn) for v in valor]
+    return valor
+
+def cargar_valores(old_json, new_json):
+    """
+    Decodificar old_value/new_value de una fila de auditoría, con los blobs expandidos
+    
+    Returns:
+        (old, new) como objetos Python (None si la columna está vacía)
+    """
+    conn = sqlite3.connect(str(DB_PATH))
+    try:
+        return tuple(
+            _expandir_blobs(json.loads(valor), conn) if valor else None
+            for valor in (old_json, new_json)
+        )
+    finally:
+        conn.close()
+
+def aplicar_diff(base, old, new):
+    """
+    Reconstruir el estado posterior a un cambio a partir del estado anterior
+    
+    Para ir hacia atrás (estado anterior desde el posterior) se intercambian
+    old y new: aplicar_diff(posterior, new, old). Los registros antiguos con
+    valores completos también sirven, porque un valor completo es un diff
+    de todas sus claves.
+    """
+    if not (isinstance(base, dict) and isinstance(old or {}, dict) and isinstance(new or {}, dict)):
+        return new
+    
+    old, new = old or {}, new or {}
+    resultado = dict(base)
+    for clave in old.keys() - new.keys():
+        resultado.pop(clave, None)
+    for clave, valor in new.items():
+        if isinstance(valor, dict) and isinstance(resultado.get(clave), dict):
+            resultado[clave] = aplicar_diff(resultado[clave], old.get(clave), valor)
+        else:
+            resultado[clave] = valor
+    return resultado
+
+def log_action(action, table_name, record_id=None, old_value=None, new_value=None, details=None,
+               username=None, role=None):
+    """
+    Registrar acción en el log de auditoría (encola; ver AuditWriter)
+    
+    old_value/new_value se guardan como diff de las claves que cambian y
+    los textos grandes como referencia a audit_blobs (ver compactar_valores).
+    username/role, si no se indican, salen del actor del contexto.
+    """
+    try:
+        actor_username, actor_role = get_actor()
+        old_json, new_json, blobs = compactar_valores(old_value, new_value)
+        registro = (
+            datetime.now().isoformat(),
+            username or actor_username,
+            role or actor_role,
+            action,
+            table_name,
+            record_id,
+            old_json,
+            new_json,
+            details
+        )
+        
+        return get_audit_writer().submit(registro, blobs)
+    except Exception as e:
+        _reportar_error(f"Error registrando auditoría: {e}")
+        return False
+
+def _inicio_dia(fecha):
+    """'YYYY-MM-DD' del día (acepta date o texto ISO)"""
+    return str(fecha)[:10]
+
+def _dia_siguiente(fecha):
+    """'YYYY-MM-DD' del día siguiente, límite superior exclusivo de un rango"""
+    return (date.fromisoformat(_inicio_dia(fecha)) + timedelta(days=1)).isoformat()
+
+def _condiciones_filtros(filters):
+    """
+    Traducir filtros a condiciones SQL que pueden usar los índices
+    
+    Las fechas se comparan como rango semiabierto sobre el texto ISO de
+    `timestamp` (timestamp >= desde AND timestamp < hasta + 1 día), en
+    lugar de DATE(timestamp), que obliga a recorrer toda la tabla.
+    """
+    conditions = []
+    params = []
+    
+    if not filters:
+        return conditions, params
+    
+    if filters.get('username'):
+        conditions.append("username = ?")
+        params.append(filters['username'])
+    if filters.get('action'):
+        conditions.append("action = ?")
+        params.append(filters['action'])
+    if filters.get('date_from'):
+        conditions.append("timestamp >= ?")
+        params.append(_inicio_dia(filters['date_from']))
+    if filters.get('date_to'):
+        conditions.append("timestamp < ?")
+        params.append(_dia_siguiente(filters['date_to']))
+    
+    return conditions, params
+
+def _fuentes_auditoria(desde=None, hasta=None):
+    """
+    Bases a consultar, de la más reciente a la más antigua
+    
+    Primero la tabla activa y después solo las particiones archivadas
+    cuyo mes cae dentro de [desde, hasta] (ver database.audit_archive).
+    """
+    yield DB_PATH
+    for mes in audit_archive.particiones(desde, hasta):
+        ruta = audit_archive.ruta_consultable(mes)
+        if ruta:
+            yield ruta
+
+def _consultar_particionado(conditions, params, limit, desde=None, hasta=None, accion_inicial=None):
+    """
+    Ejecutar una consulta ordenada por (timestamp, id) DESC sobre la tabla
+    activa y las particiones del rango, hasta reunir `limit` filas
+    
+    Las particiones son meses disjuntos y más antiguos que la tabla activa,
+    así que basta concatenar los resultados en orden.
+    
+    Con `accion_inicial` (p. ej. 'CREATE' en el historial de un registro),
+    la primera fila con esa acción cierra la búsqueda: se descartan las
+    filas anteriores y no se abren (ni descomprimen) particiones más antiguas.
+    """
+    import pandas as pd
+    
+    query = "SELECT * FROM audit_log"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    
+    frames = []
+    restantes = int(limit)
+    for ruta in _fuentes_auditoria(desde, hasta):
+        conn = sqlite3.connect(str(ruta))
+        df = pd.read_sql_query(query, conn, params=params + [restantes])
+        conn.close()
+        
+        if frames and df.empty:
+            continue
+        
+        inicio = None
+        if accion_inicial is not None and not df.empty:
+            inicios = (df['action'] == accion_inicial).to_numpy().nonzero()[0]
+            if len(inicios):
+                inicio = inicios[0]
+                df = df.iloc[:inicio + 1]
+        
+        frames.append(df)
+        restantes -= len(df)
+        if restantes <= 0 or inicio is not None:
+            break
+    
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+def get_audit_log(limit=100, filters=None):
+    """Obtener registros de auditoría (incluye meses archivados del rango)"""
+    import pandas as pd
+    
+    try:
+        filters = filters or {}
+        conditions, params = _condiciones_filtros(filters)
+        
+        return _consultar_particionado(
+            conditions, params, limit,
+            desde=filters.get('date_from'), hasta=filters.get('date_to')
+        )
+    except Exception as e:
+        _reportar_error(f"Error obteniendo logs: {e}")
+        return pd.DataFrame()
+
+def get_audit_page(after_ts=None, after_id=None, page_size=50, filters=None):
+    """
+    Obtener una página de auditoría con paginación por cursor (keyset)
+    
+    Las filas van de la más reciente a la más antigua. Para la página
+    siguiente se pasa el cursor devuelto; el costo es el mismo para la
+    primera página que para la número 10.000 porque no se usa OFFSET.
+    
+    Args:
+        after_ts: timestamp de la última fila de la página anterior
+        after_id: id de la última fila de la página anterior
+        page_size: filas por página
+        filters: mismos filtros que get_audit_log
+    
+    Returns:
+        (DataFrame, cursor siguiente (timestamp, id) o None si no hay más)
+    """
+    import pandas as pd
+    
+    try:
+        filters = filters or {}
+        conditions, params = _condiciones_filtros(filters)
+        
+        return _pagina_keyset(
+            conditions, params, after_ts, after_id, page_size,
+            desde=filters.get('date_from'), hasta=filters.get('date_to')
+        )
+    except Exception as e:
+        _reportar_error(f"Error obteniendo logs: {e}")
+        return pd.DataFrame(), None
+
+def _pagina_keyset(conditions, params, after_ts, after_id, page_size, desde=None, hasta=None, accion_inicial=None):
+    """Página de `page_size` filas después del cursor (timestamp, id) y el cursor siguiente"""
+    conditions, params = list(conditions), list(params)
+    if after_ts is not None and after_id is not None:
+        conditions.append("(timestamp, id) < (?, ?)")
+        params.extend([after_ts, int(after_id)])
+        hasta = min(str(hasta), after_ts) if hasta else after_ts
+    
+    # Se pide una fila de más para saber si existe página siguiente
+    df = _consultar_particionado(
+        conditions, params, int(page_size) + 1, desde=desde, hasta=hasta, accion_inicial=accion_inicial
+    )
+    
+    siguiente = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        ultima = df.iloc[-1]
+        siguiente = (ultima['timestamp'], int(ultima['id']))
+    
+    return df, siguiente
+
+def get_record_history(table_name, record_id, after_ts=None, after_id=None, page_size=20, desde=None):
+    """
+    Historial de cambios de un registro, del más reciente al más antiguo
+    
+    Usa el índice (table_name, record_id, timestamp), así que solo lee las
+    filas del registro. Se pagina igual que get_audit_page.
+    
+    El historial termina en la creación del registro (acción CREATE): las
+    particiones más antiguas no se leen, y las filas de un registro anterior
+    con el mismo id no se mezclan. `desde` acota además la búsqueda por
+    fecha cuando se conoce el alta.
+    
+    Returns:
+        (DataFrame, cursor siguiente (timestamp, id) o None si no hay más)
+    """
+    import pandas as pd
+    
+    try:
+        return _pagina_keyset(
+            ["table_name = ?", "record_id = ?"], [table_name, int(record_id)],
+            after_ts, after_id, page_size, desde=desde, accion_inicial='CREATE'
+        )
+    except Exception as e:
+        _reportar_error(f"Error obteniendo historial: {e}")
+        return pd.DataFrame(), None
+
+def iter_audit_log(filters=None, chunk_size=5000):
+    """
+    Recorrer la auditoría completa del rango por lotes (exportaciones)
+    
+    Cada lote es una consulta keyset independiente sobre la tabla activa
+    o una partición, así no se mantiene abierta una lectura larga que
+    bloquee al escritor de auditoría, y la memoria depende solo de
+    `chunk_size`, no del tamaño del rango.
+    
+    Args:
+        filters: mismos filtros que get_audit_log
+        chunk_size: filas por lote
+    
+    Yields:
+        (columnas, lista de tuplas), de la fila más reciente a la más antigua
+    """
+    filters = filters or {}
+    conditions, params = _condiciones_filtros(filters)
+    
+    for ruta in _fuentes_auditoria(filters.get('date_from'), filters.get('date_to')):
+        cursor = None
+        while True:
+            condiciones = list(conditions)
+            parametros = list(params)
+            if cursor:
+                condiciones.append("(timestamp, id) < (?, ?)")
+                parametros.extend(cursor)
+            
+            query = "SELECT * FROM audit_log"
+            if condiciones:
+                query += " WHERE " + " AND ".join(condiciones)
+            query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+            
+            conn = sqlite3.connect(str(ruta))
+            try:
+                c = conn.execute(query, parametros + [int(chunk_size)])
+                columnas = [d[0] for d in c.description]
+                filas = c.fetchall()
+            finally:
+                conn.close()
+            
+            if not filas:
+                break
+            yield columnas, filas
+            
+            if len(filas) < chunk_size:
+                break
+            ultima = dict(zip(columnas, filas[-1]))
+            cursor = (ultima['timestamp'], ultima['id'])
+
+def get_recent_actions(limit=10):
+    """Obtener acciones recientes"""
+    import pandas as pd
+    
+    try:
+        conn = sqlite3.connect(str(DB_PATH))
+        query = """
+            SELECT timestamp, username, action, table_name, details 
+            FROM audit_log 
+            ORDER BY timestamp DESC 
+            LIMIT ?
+        """
+        df = pd.read_sql_query(query, conn, params=[limit])
+        conn.close()
+        return df
+    except Exception as e:
+        _reportar_error(f"Error obteniendo acciones recientes: {e}")
+        return pd.DataFrame()
+
+def get_user_stats(username=None):
+    """
+    Obtener estadísticas de usuario
+    
+    Lee el resumen audit_stats_daily (índice por usuario) en lugar de
+    agrupar todo el log. clear_old_logs descuenta los días que depura, así
+    que las cifras corresponden a los registros que se conservan.
+    """
+    import pandas as pd
+    
+    try:
+        conn = sqlite3.connect(str(DB_PATH))
+        
+        if username:
+            query = """
+                SELECT action, SUM(count) as count
+                FROM audit_stats_daily
+                WHERE username = ?
+                GROUP BY action
+                ORDER BY count DESC
+            """
+            params = [username]
+        else:
+            query = """
+                SELECT action, SUM(count) as count
+                FROM audit_stats_daily
+                GROUP BY action
+                ORDER BY count DESC
+            """
+            params = []
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    except Exception as e:
+        _reportar_error(f"Error obteniendo estadísticas: {e}")
+        return pd.DataFrame()
+
+def _blobs_referenciados(conn):
+    """Hashes de audit_blobs usados por old_value/new_value de audit_log en `conn`"""
+    referenciados = set()
+    filas = conn.execute("""
+        SELECT old_value, new_value FROM audit_log
+        WHERE instr(old_value, '"$blob"') > 0 OR instr(new_value, '"$blob"') > 0
+    """)
+    for old_value, new_value in filas:
+        for valor in (old_value, new_value):
+            if valor:
+                referenciados.update(BLOB_REF_RE.findall(valor))
+    return referenciados
+
+def purgar_blobs():
+    """
+    Eliminar de audit_blobs los valores que ya no referencia ningún registro
+    
+    Recorre la tabla activa y todas las particiones con el bloqueo de
+    escritura de auditoria.db tomado, para que ni AuditWriter ni
+    archivar_meses agreguen o muevan referencias mientras tanto.
+    Devuelve los blobs eliminados.
+    """
+    conn = sqlite3.connect(str(DB_PATH), timeout=30)
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            referenciados = _blobs_referenciados(conn)
+            for mes in audit_archive.particiones():
+                ruta = audit_archive.ruta_consultable(mes)
+                if ruta:
+                    particion = sqlite3.connect(str(ruta))
+                    try:
+                        referenciados |= _blobs_referenciados(particion)
+                    finally:
+                        particion.close()
+            
+            huerfanos = [
+                (hash_,) for (hash_,) in conn.execute("SELECT hash FROM audit_blobs")
+                if hash_ not in referenciados
+            ]
+            conn.executemany("DELETE FROM audit_blobs WHERE hash = ?", huerfanos)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(huerfanos)
+    finally:
+        conn.close()
+
+def clear_old_logs(days=90):
+    """
+    Eliminar logs antiguos (por defecto más de 90 días)
+    
+    Los meses archivados que quedan enteros antes del límite se eliminan
+    borrando su archivo; el resto (tabla activa y partición del mes límite,
+    comprimida o no) se borra con DELETE por rango de índice.
+    Devuelve las filas borradas con DELETE.
+    """
+    try:
+        fecha_limite = (date.today() - timedelta(days=days)).isoformat()
+        
+        eliminadas = audit_archive.eliminar_particiones(fecha_limite)
+        if eliminadas:
+            print(f"🧹 Particiones de auditoría eliminadas: {', '.join(eliminadas)}")
+        
+        # Partición del mes límite (aunque esté comprimida) y tabla activa
+        deleted = audit_archive.recortar_particion(fecha_limite)
+        
+        conn = sqlite3.connect(str(DB_PATH))
+        c = conn.cursor()
+        
+        c.execute("""
+            DELETE FROM audit_log
+            WHERE timestamp < ?
+        """, (fecha_limite,))
+        
+        deleted += c.rowcount
+        
+        # El resumen es por día y el límite cae en un cambio de día: se
+        # descuentan exactamente los días depurados
+        c.execute("DELETE FROM audit_stats_daily WHERE dia < ?", (fecha_limite,))
+        conn.commit()
+        conn.close()
+        
+        # Fotos y otros valores grandes que solo usaban los registros borrados
+        purgados = purgar_blobs()
+        if purgados:
+            print(f"🧹 Valores de auditoría sin referencias eliminados: {purgados}")
+        
+        return deleted
+    except Exception as e:
+        _reportar_error(f"Error limpiando logs: {e}")
+        return 0
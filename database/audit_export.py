@@ -0,0 +1,118 @@
+"""
+Exportación por lotes del log de auditoría (CSV / Parquet)
+
+Las filas se leen con database.audit.iter_audit_log y se escriben en el
+destino lote a lote, así se puede exportar un trimestre o un año completo
+sin cargarlo en un DataFrame.
+"""
+import csv
+import io
+from pathlib import Path
+from database.audit_core import iter_audit_log
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+FORMATOS = ('csv', 'parquet')
+TAMANO_LOTE = 5000
+
+# Columnas enteras de audit_log; el resto se exporta como texto
+COLUMNAS_ENTERAS = {'id', 'record_id'}
+
+def _abrir(destino, modo):
+    """Abrir `destino` si es una ruta; si ya es un archivo, usarlo tal cual"""
+    if isinstance(destino, (str, Path)):
+        return open(destino, modo, **({'newline': '', 'encoding': 'utf-8'} if 't' in modo else {})), True
+    return destino, False
+
+def exportar_csv(destino, filters=None, chunk_size=TAMANO_LOTE):
+    """
+    Escribir la auditoría del rango en CSV (UTF-8, con encabezado)
+    
+    Args:
+        destino: ruta o archivo abierto en modo binario
+        filters: mismos filtros que get_audit_log
+        chunk_size: filas por lote
+    
+    Returns:
+        Número de filas exportadas
+    """
+    archivo, propio = _abrir(destino, 'wt')
+    texto = archivo if propio else io.TextIOWrapper(archivo, encoding='utf-8', newline='')
+    writer = csv.writer(texto)
+    total = 0
+    
+    try:
+        for columnas, filas in iter_audit_log(filters, chunk_size):
+            if total == 0:
+                writer.writerow(columnas)
+            writer.writerows(filas)
+            total += len(filas)
+        texto.flush()
+    finally:
+        if propio:
+            archivo.close()
+        else:
+            # No cerrar el archivo del llamador al liberar el envoltorio
+            texto.detach()
+    
+    return total
+
+def exportar_parquet(destino, filters=None, chunk_size=TAMANO_LOTE):
+    """
+    Escribir la auditoría del rango en Parquet, un row group por lote
+    
+    Requiere pyarrow (opcional).
+    
+    Returns:
+        Número de filas exportadas
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("pyarrow no está instalado: la exportación Parquet no está disponible")
+    
+    archivo, propio = _abrir(destino, 'wb')
+    writer = None
+    total = 0
+    
+    try:
+        for columnas, filas in iter_audit_log(filters, chunk_size):
+            if writer is None:
+                schema = pa.schema([
+                    (col, pa.int64() if col in COLUMNAS_ENTERAS else pa.string())
+                    for col in columnas
+                ])
+                writer = pq.ParquetWriter(archivo, schema)
+            
+            datos = {col: [fila[i] for fila in filas] for i, col in enumerate(columnas)}
+            writer.write_table(pa.Table.from_pydict(datos, schema=schema))
+            total += len(filas)
+    finally:
+        if writer is not None:
+            writer.close()
+        if propio:
+            archivo.close()
+    
+    return total
+
+def exportar_auditoria(destino, formato='csv', filters=None, chunk_size=TAMANO_LOTE):
+    """
+    Exportar la auditoría del rango en el formato indicado
+    
+    Args:
+        destino: ruta o archivo abierto en modo binario
+        formato: 'csv' o 'parquet'
+        filters: mismos filtros que get_audit_log
+        chunk_size: filas por lote
+    
+    Returns:
+        Número de filas exportadas
+    """
+    if formato == 'csv':
+        return exportar_csv(destino, filters, chunk_size)
+    if formato == 'parquet':
+        return exportar_parquet(destino, filters, chunk_size)
+    raise ValueError(f"Formato no soportado: {formato}")
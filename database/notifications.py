@@ -1,46 +1,19 @@
 """
 Sistema de Notificaciones In-App
-Gestión de notificaciones dentro de la aplicación
+Gestión de notificaciones dentro de la aplicación (almacén: notifications.store)
 """
 
-import sqlite3
 import pandas as pd
-from datetime import datetime
 import streamlit as st
-import os
+from notifications import store
+from notifications.event_bus import Buzon
+from notifications.store import DB_PATH, init_notifications_db
 
-DB_PATH = 'database/notifications.db'
-
-def init_notifications_db():
-    """Crear tabla de notificaciones"""
-    os.makedirs('database', exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            username TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            type TEXT NOT NULL,
-            title TEXT NOT NULL,
-            message TEXT NOT NULL,
-            read INTEGER DEFAULT 0,
-            link TEXT,
-            icon TEXT DEFAULT '📢',
-            priority TEXT DEFAULT 'normal'
-        )
-    ''')
-    
-    # Crear índices
-    c.execute('CREATE INDEX IF NOT EXISTS idx_user ON notifications(username)')
-    c.execute('CREATE INDEX IF NOT EXISTS idx_read ON notifications(read)')
-    c.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON notifications(timestamp)')
-    
-    conn.commit()
-    conn.close()
+# Fragmentos (Streamlit >= 1.33): el panel se refresca solo, sin rerun de la página.
+# Con la versión fijada en requirements.txt (1.31) no existen: el badge y el
+# panel se actualizan en el próximo rerun (cualquier interacción del usuario).
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+INTERVALO_REFRESCO = 10  # segundos entre revisiones del buzón
 
 def add_notification(username, type, title, message, link=None, icon="📢", priority="normal"):
     """
@@ -56,47 +29,33 @@ def add_notification(username, type, title, message, link=None, icon="📢", pri
         priority: Prioridad (low, normal, high)
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute('''
-            INSERT INTO notifications 
-            (username, timestamp, type, title, message, link, icon, priority)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            username,
-            datetime.now().isoformat(),
-            type,
-            title,
-            message,
-            link,
-            icon,
-            priority
-        ))
-        
-        conn.commit()
-        conn.close()
+        store.add_notification(username, type, title, message, link=link, icon=icon, priority=priority)
         return True
         
     except Exception as e:
         st.error(f"Error agregando notificación: {e}")
         return False
 
-def add_notification_to_all(type, title, message, icon="📢", exclude_roles=None):
-    """Agregar notificación a todos los usuarios"""
-    from auth import load_config
+def add_notification_to_all(type, title, message, icon="📢", exclude_roles=None, roles=None, areas=None,
+                            link=None, priority="normal"):
+    """
+    Agregar notificación a todos los usuarios (o a los roles/áreas indicados)
     
-    config = load_config()
-    usernames = config['credentials']['usernames'].keys()
+    Lee config.yaml una vez e inserta todas las notificaciones en una sola
+    transacción. Devuelve la cantidad de notificaciones creadas.
+    """
+    from auth import load_config
     
-    for username in usernames:
-        user_role = config['credentials']['usernames'][username]['role']
-        
-        # Excluir roles si se especifican
-        if exclude_roles and user_role in exclude_roles:
-            continue
+    try:
+        usuarios = load_config()['credentials']['usernames']
+        return store.add_notification_to_all(
+            usuarios, type, title, message, link=link, icon=icon, priority=priority,
+            roles=roles, areas=areas, exclude_roles=exclude_roles
+        )
         
-        add_notification(username, type, title, message, icon=icon)
+    except Exception as e:
+        st.error(f"Error agregando notificaciones: {e}")
+        return 0
 
 def get_user_notifications(username, unread_only=False, limit=50):
     """
@@ -111,23 +70,7 @@ def get_user_notifications(username, unread_only=False, limit=50):
         DataFrame con notificaciones
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        
-        query = "SELECT * FROM notifications WHERE username = ?"
-        params = [username]
-        
-        if unread_only:
-            query += " AND read = 0"
-        
-        query += " ORDER BY timestamp DESC"
-        
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
-        
-        return df
+        return store.get_user_notifications(username, unread_only=unread_only, limit=limit)
         
     except Exception as e:
         st.error(f"Error obteniendo notificaciones: {e}")
@@ -136,14 +79,7 @@ def get_user_notifications(username, unread_only=False, limit=50):
 def get_unread_count(username):
     """Obtener cantidad de notificaciones no leídas"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute("SELECT COUNT(*) FROM notifications WHERE username = ? AND read = 0", (username,))
-        count = c.fetchone()[0]
-        
-        conn.close()
-        return count
+        return store.get_unread_count(username)
         
     except Exception as e:
         return 0
@@ -151,13 +87,7 @@ def get_unread_count(username):
 def mark_notification_read(notification_id):
     """Marcar notificación como leída"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute("UPDATE notifications SET read = 1 WHERE id = ?", (notification_id,))
-        
-        conn.commit()
-        conn.close()
+        store.mark_notification_read(notification_id)
         return True
         
     except Exception as e:
@@ -167,13 +97,7 @@ def mark_notification_read(notification_id):
 def mark_all_read(username):
     """Marcar todas las notificaciones como leídas"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute("UPDATE notifications SET read = 1 WHERE username = ? AND read = 0", (username,))
-        
-        conn.commit()
-        conn.close()
+        store.mark_all_read(username)
         return True
         
     except Exception as e:
@@ -183,13 +107,7 @@ def mark_all_read(username):
 def delete_notification(notification_id):
     """Eliminar una notificación"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
-        
-        conn.commit()
-        conn.close()
+        store.delete_notification(notification_id)
         return True
         
     except Exception as e:
@@ -199,19 +117,68 @@ def delete_notification(notification_id):
 def delete_all_notifications(username):
     """Eliminar todas las notificaciones de un usuario"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute("DELETE FROM notifications WHERE username = ?", (username,))
-        
-        conn.commit()
-        conn.close()
+        store.delete_all_notifications(username)
         return True
         
     except Exception as e:
         st.error(f"Error eliminando notificaciones: {e}")
         return False
 
+def _buzon_sesion(username):
+    """Buzón de eventos de la sesión actual (se crea al primer uso o al cambiar de usuario)"""
+    buzon = st.session_state.get('notif_buzon')
+    if buzon is None or buzon.username != username:
+        if buzon is not None:
+            buzon.cerrar()
+        buzon = Buzon(username)
+        st.session_state['notif_buzon'] = buzon
+        st.session_state.pop('notif_panel', None)
+    return buzon
+
+def _datos_panel(username, limit=5):
+    """
+    Contador y últimas `limit` notificaciones de la sesión
+    
+    La firma es la versión del buzón (eventos de este proceso) más la
+    versión del usuario en notification_unread (cambios de cualquier
+    proceso en sus notificaciones): cada rerun lee solo esa fila y la
+    lista se vuelve a consultar únicamente si la firma cambió. Las
+    escrituras de otros usuarios o en otras tablas no la invalidan.
+    """
+    buzon = _buzon_sesion(username)
+    try:
+        unread, version = store.estado_usuario(username)
+    except Exception:
+        unread, version = 0, None
+    firma = (buzon.version, version)
+    cache = st.session_state.setdefault('notif_panel', {})
+    datos = cache.get(limit)
+    if datos is None or datos['firma'] != firma:
+        datos = {
+            'firma': firma,
+            'recientes': get_user_notifications(username, limit=limit) if limit else None,
+        }
+        cache[limit] = datos
+    datos['unread'] = unread
+    return datos
+
+def _mostrar_badge(username):
+    unread_count = _datos_panel(username, limit=0)['unread']
+    if unread_count > 0:
+        st.markdown(f"""
+            <div style='background: #fff3cd; padding: 10px; border-radius: 5px; text-align: center; margin-bottom: 1rem;'>
+                <span class='notification-badge'>{unread_count}</span> 
+                <span style='color: #856404;'>notificaciones nuevas</span>
+            </div>
+        """, unsafe_allow_html=True)
+
+_badge = _fragment(run_every=INTERVALO_REFRESCO)(_mostrar_badge) if _fragment else _mostrar_badge
+
+def show_notification_badge(username):
+    """Badge de no leídas del sidebar (se refresca solo si hay fragmentos)"""
+    if username:
+        _badge(username)
+
 def show_notifications_sidebar():
     """Mostrar panel de notificaciones en el sidebar"""
     username = st.session_state.get('username')
@@ -221,62 +188,82 @@ def show_notifications_sidebar():
     with st.sidebar:
         st.markdown("---")
         st.markdown("### 🔔 Notificaciones")
+        _panel(username)
+
+def _linea_panel(notif):
+    """Título de la notificación con su color según tipo"""
+    if notif['type'] == 'error':
+        color = "🔴"
+    elif notif['type'] in ('warning', 'sobrecarga'):
+        color = "🟡"
+    elif notif['type'] == 'success':
+        color = "🟢"
+    else:
+        color = "🔵"
+    
+    return (f"{notif['icon']} {notif['title']}" +
+            (f" (×{notif['count']})" if notif.get('count', 1) > 1 else "") +
+            (f" {color}" if notif['read'] == 0 else ""))
+
+def _mostrar_panel(username):
+    """Contenido del panel; consulta la base solo si llegaron eventos"""
+    datos = _datos_panel(username)
+    unread_count = datos['unread']
+    
+    if unread_count > 0:
+        st.markdown(f"**{unread_count}** nuevas notificaciones")
+    else:
+        st.markdown("No hay notificaciones nuevas")
+    
+    # Botones de acción
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("✓ Marcar todas", key="mark_all", use_container_width=True):
+            mark_all_read(username)
+            st.rerun()
+    
+    with col2:
+        if st.button("🗑️ Limpiar", key="clear_all", use_container_width=True):
+            delete_all_notifications(username)
+            st.rerun()
+    
+    # Mostrar últimas notificaciones: una línea por notificación y botones
+    # solo para la que se abre
+    notif_df = datos['recientes']
+    
+    if not notif_df.empty:
+        notificaciones = {int(notif['id']): notif for _, notif in notif_df.iterrows()}
+        seleccion = st.selectbox(
+            "Notificación",
+            [None] + list(notificaciones),
+            format_func=lambda notif_id: "Ver detalle…" if notif_id is None else _linea_panel(notificaciones[notif_id]),
+            label_visibility="collapsed",
+            key="notif_panel_sel"
+        )
         
-        # Obtener notificaciones
-        unread_count = get_unread_count(username)
-        
-        if unread_count > 0:
-            st.markdown(f"**{unread_count}** nuevas notificaciones")
+        if seleccion is None:
+            for notif in notificaciones.values():
+                st.caption(_linea_panel(notif))
         else:
-            st.markdown("No hay notificaciones nuevas")
-        
-        # Botones de acción
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("✓ Marcar todas", key="mark_all", use_container_width=True):
-                mark_all_read(username)
-                st.rerun()
-        
-        with col2:
-            if st.button("🗑️ Limpiar", key="clear_all", use_container_width=True):
-                delete_all_notifications(username)
-                st.rerun()
-        
-        # Mostrar últimas notificaciones
-        notif_df = get_user_notifications(username, limit=5)
-        
-        if not notif_df.empty:
-            for _, notif in notif_df.iterrows():
-                # Determinar color según tipo
-                if notif['type'] == 'error':
-                    color = "🔴"
-                elif notif['type'] == 'warning':
-                    color = "🟡"
-                elif notif['type'] == 'success':
-                    color = "🟢"
-                else:
-                    color = "🔵"
-                
-                # Mostrar notificación
-                with st.expander(
-                    f"{notif['icon']} {notif['title']}" + 
-                    (f" {color}" if notif['read'] == 0 else ""),
-                    expanded=(notif['read'] == 0 and notif['priority'] == 'high')
-                ):
-                    st.markdown(notif['message'])
-                    st.caption(f"📅 {notif['timestamp'][:16]}")
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if notif['read'] == 0:
-                            if st.button("✓", key=f"read_{notif['id']}", help="Marcar leída"):
-                                mark_notification_read(notif['id'])
-                                st.rerun()
-                    
-                    with col2:
-                        if st.button("🗑️", key=f"del_{notif['id']}", help="Eliminar"):
-                            delete_notification(notif['id'])
-                            st.rerun()
+            notif = notificaciones[seleccion]
+            # Las agrupadas traen un mensaje por línea
+            st.markdown(notif['message'].replace('\n', '  \n'))
+            st.caption(f"📅 {notif['timestamp'][:16]}")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if notif['read'] == 0:
+                    if st.button("✓", key="notif_panel_read", help="Marcar leída"):
+                        mark_notification_read(notif['id'])
+                        st.rerun()
+            
+            with col2:
+                if st.button("🗑️", key="notif_panel_del", help="Eliminar"):
+                    delete_notification(notif['id'])
+                    st.session_state.pop('notif_panel_sel', None)
+                    st.rerun()
+
+_panel = _fragment(run_every=INTERVALO_REFRESCO)(_mostrar_panel) if _fragment else _mostrar_panel
 
 def notify_user(username, type, title, message, **kwargs):
     """Función helper para enviar notificación rápidamente"""
@@ -289,6 +276,7 @@ class NotificationType:
     SUCCESS = "success"
     ERROR = "error"
     REMINDER = "reminder"
+    SOBRECARGA = "sobrecarga"
 
 # Prioridades
 class Priority:
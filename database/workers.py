@@ -4,6 +4,7 @@ Gestión de trabajadores y horas en SQLite
 import sqlite3
 import pandas as pd
 import json
+import re
 from pathlib import Path
 from datetime import datetime
 
@@ -35,10 +36,16 @@ def init_workers_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             nombre TEXT UNIQUE NOT NULL,
             descripcion TEXT,
-            activo INTEGER DEFAULT 1
+            activo INTEGER DEFAULT 1,
+            fecha_modificacion TEXT
         )
     ''')
     
+    # Migración: bases creadas antes de que rubros tuviera fecha_modificacion
+    columnas_rubros = [col[1] for col in c.execute("PRAGMA table_info(rubros)")]
+    if 'fecha_modificacion' not in columnas_rubros:
+        c.execute("ALTER TABLE rubros ADD COLUMN fecha_modificacion TEXT")
+    
     # Tabla de asignación de horas
     c.execute('''
         CREATE TABLE IF NOT EXISTS horas_asignadas (
@@ -54,6 +61,51 @@ def init_workers_db():
         )
     ''')
     
+    # Índices por fecha de modificación (sincronización incremental)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_trabajadores_fecha_mod ON trabajadores(fecha_modificacion)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rubros_fecha_mod ON rubros(fecha_modificacion)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_horas_fecha_asig ON horas_asignadas(fecha_asignacion)')
+    
+    # Índice de texto completo (FTS5) para la búsqueda de trabajadores
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trabajadores_fts'")
+    fts_existente = c.fetchone() is not None
+    
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS trabajadores_fts USING fts5(
+            nombre, email, area, telefono,
+            content='trabajadores',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    
+    # Triggers que mantienen el índice sincronizado con la tabla
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trabajadores_fts_ai AFTER INSERT ON trabajadores BEGIN
+            INSERT INTO trabajadores_fts (rowid, nombre, email, area, telefono)
+            VALUES (new.id, new.nombre, new.email, new.area, new.telefono);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trabajadores_fts_ad AFTER DELETE ON trabajadores BEGIN
+            INSERT INTO trabajadores_fts (trabajadores_fts, rowid, nombre, email, area, telefono)
+            VALUES ('delete', old.id, old.nombre, old.email, old.area, old.telefono);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trabajadores_fts_au
+        AFTER UPDATE OF nombre, email, area, telefono ON trabajadores BEGIN
+            INSERT INTO trabajadores_fts (trabajadores_fts, rowid, nombre, email, area, telefono)
+            VALUES ('delete', old.id, old.nombre, old.email, old.area, old.telefono);
+            INSERT INTO trabajadores_fts (rowid, nombre, email, area, telefono)
+            VALUES (new.id, new.nombre, new.email, new.area, new.telefono);
+        END
+    ''')
+    
+    # Indexar los trabajadores que ya existían antes del índice
+    if not fts_existente:
+        c.execute("INSERT INTO trabajadores_fts (trabajadores_fts) VALUES ('rebuild')")
+    
     conn.commit()
     conn.close()
 
@@ -97,6 +149,43 @@ def obtener_trabajadores(area=None, estatus='activo'):
     
     return df
 
+def _consulta_prefijos(texto):
+    """Convertir texto libre en una consulta FTS5 de prefijos: "juan"* "per"*"""
+    tokens = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def buscar_trabajadores(texto, area=None, estatus='activo', limit=50):
+    """Buscar trabajadores por prefijo en nombre, email, área o teléfono
+    
+    Usa el índice FTS5 `trabajadores_fts`; no distingue mayúsculas ni tildes.
+    Sin texto de búsqueda devuelve lo mismo que obtener_trabajadores.
+    """
+    consulta = _consulta_prefijos(texto)
+    if not consulta:
+        return obtener_trabajadores(area=area, estatus=estatus)
+    
+    conn = sqlite3.connect(str(DB_PATH))
+    
+    query = '''
+        SELECT t.*
+        FROM trabajadores_fts f
+        JOIN trabajadores t ON t.id = f.rowid
+        WHERE trabajadores_fts MATCH ? AND t.estatus = ?
+    '''
+    params = [consulta, estatus]
+    
+    if area:
+        query += " AND t.area = ?"
+        params.append(area)
+    
+    query += " ORDER BY f.rank LIMIT ?"
+    params.append(limit)
+    
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return df
+
 def actualizar_trabajador(trabajador_id, **kwargs):
     """Actualizar datos de trabajador"""
     conn = sqlite3.connect(str(DB_PATH))
@@ -198,7 +287,8 @@ def agregar_rubro(nombre, descripcion=""):
     c = conn.cursor()
     
     try:
-        c.execute('INSERT INTO rubros (nombre, descripcion) VALUES (?, ?)', (nombre, descripcion))
+        c.execute('INSERT INTO rubros (nombre, descripcion, fecha_modificacion) VALUES (?, ?, ?)',
+                  (nombre, descripcion, datetime.now().isoformat()))
         rubro_id = c.lastrowid
         conn.commit()
         conn.close()
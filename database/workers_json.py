@@ -2,8 +2,11 @@
 Base de datos JSON simple - Reemplazo de SQLite
 """
 import json
+import re
+import unicodedata
 from pathlib import Path
 from datetime import datetime
+from notifications.event_bus import publicar_horas_cambiadas
 
 # Rutas de archivos JSON
 BASE_DIR = Path(__file__).parent
@@ -70,6 +73,18 @@ def init_json_db():
         HORAS_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False))
         print(f"✅ Creado: {HORAS_FILE}")
 
+# ==================== VERSIONES ====================
+
+def sellar_version(data, registro):
+    """Marcar un registro como modificado con la siguiente versión del archivo
+    
+    Cada archivo JSON lleva un contador `version` que crece con cada cambio;
+    el registro guarda la versión en que cambió por última vez. Permite a
+    sincronizar.py copiar solo lo modificado desde la última sincronización.
+    """
+    data['version'] = data.get('version', 0) + 1
+    registro['version'] = data['version']
+
 # ==================== TRABAJADORES ====================
 
 def leer_trabajadores():
@@ -107,6 +122,41 @@ def obtener_trabajadores(area=None, estatus='activo'):
     import pandas as pd
     return pd.DataFrame(trabajadores)
 
+def _tokens_busqueda(texto):
+    """Separar texto en palabras en minúsculas y sin tildes"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).lower()
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    return re.findall(r'\w+', texto)
+
+def buscar_trabajadores(texto, area=None, estatus='activo', limit=50):
+    """Buscar trabajadores por prefijo en nombre, email, área o teléfono
+    
+    Misma interfaz que database.workers.buscar_trabajadores (FTS5). Cada
+    palabra buscada debe ser prefijo de alguna palabra del trabajador.
+    """
+    consulta = _tokens_busqueda(texto)
+    if not consulta:
+        return obtener_trabajadores(area=area, estatus=estatus)
+    
+    data = leer_trabajadores()
+    
+    resultado = []
+    for t in data['trabajadores']:
+        if t['estatus'] != estatus or (area and t.get('area') != area):
+            continue
+        
+        palabras = _tokens_busqueda(' '.join(
+            str(t.get(campo) or '') for campo in ('nombre', 'email', 'area', 'telefono')
+        ))
+        if all(any(p.startswith(q) for p in palabras) for q in consulta):
+            resultado.append(t)
+            if len(resultado) >= limit:
+                break
+    
+    # Convertir a DataFrame para compatibilidad
+    import pandas as pd
+    return pd.DataFrame(resultado)
+
 def agregar_trabajador(nombre, email, telefono="", area="", foto=None):
     """Agregar nuevo trabajador"""
     data = leer_trabajadores()
@@ -127,6 +177,7 @@ def agregar_trabajador(nombre, email, telefono="", area="", foto=None):
     
     data['trabajadores'].append(nuevo_trabajador)
     data['next_id'] += 1
+    sellar_version(data, nuevo_trabajador)
     
     guardar_trabajadores(data)
     
@@ -160,6 +211,7 @@ def actualizar_trabajador(trabajador_id, **kwargs):
             print(f"  - {key}: {old_value if key != 'foto' else '[foto]'} → {value if key != 'foto' else '[foto base64]'}")
     
     # Guardar
+    sellar_version(data, trabajador)
     data['trabajadores'][trabajador_index] = trabajador
     guardar_trabajadores(data)
     print(f"✅ Trabajador {trabajador_id} actualizado")
@@ -230,6 +282,7 @@ def agregar_rubro(nombre, descripcion=""):
     
     data['rubros'].append(nuevo_rubro)
     data['next_id'] += 1
+    sellar_version(data, nuevo_rubro)
     
     guardar_rubros(data)
     
@@ -258,6 +311,7 @@ def actualizar_rubro(rubro_id, **kwargs):
             print(f"  - {key}: {rubro[key]} → {value}")
             rubro[key] = value
     
+    sellar_version(data, rubro)
     guardar_rubros(data)
     print(f"✅ Rubro {rubro_id} actualizado")
     return True
@@ -309,6 +363,7 @@ def asignar_horas(trabajador_id, rubro_id, horas, año=None):
         # Actualizar
         print(f"🔍 Actualizando: Trabajador {trabajador_id}, Rubro {rubro_id}: {hora_existente['horas']}h → {horas}h")
         hora_existente['horas'] = horas
+        sellar_version(data, hora_existente)
     else:
         # Crear nuevo
         nueva_hora = {
@@ -320,10 +375,14 @@ def asignar_horas(trabajador_id, rubro_id, horas, año=None):
         }
         data['horas_asignadas'].append(nueva_hora)
         data['next_id'] += 1
+        sellar_version(data, nueva_hora)
         print(f"🔍 Insertando: Trabajador {trabajador_id}, Rubro {rubro_id}: {horas}h")
     
     guardar_horas(data)
     print(f"✅ Horas guardadas: {horas}h")
+    
+    # Re-evaluar la sobrecarga de este trabajador (notifications.sobrecargas)
+    publicar_horas_cambiadas(trabajador_id, año, rubro_id, horas)
     return True
 
 def obtener_horas_trabajador(trabajador_id, año=None):
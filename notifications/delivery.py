@@ -0,0 +1,138 @@
+"""
+Envío concurrente de emails con límite de tasa
+
+Los jobs del scheduler arman la lista de emails y la entregan aquí: un
+pool acotado de hilos envía en paralelo y un token bucket compartido
+mantiene la tasa dentro de lo que admite el proveedor. Un fallo (False o
+excepción) de un destinatario se registra y no afecta a los demás.
+
+Para probar los jobs sin enviar nada, pasar email_service=FakeEmailService().
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from notifications.job_metrics import ejecucion_actual
+
+EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', '8'))
+# Emails por segundo y ráfaga máxima del token bucket
+EMAIL_RATE = float(os.getenv('EMAIL_RATE_PER_SECOND', '2'))
+EMAIL_BURST = int(os.getenv('EMAIL_BURST', '5'))
+
+class TokenBucket:
+    """
+    Token bucket seguro entre hilos: `rate` tokens por segundo, hasta `capacity`
+    
+    `reloj` y `dormir` se pueden reemplazar (p. ej. por un reloj simulado
+    en las pruebas) para no depender del tiempo real.
+    """
+    
+    def __init__(self, rate, capacity, reloj=time.monotonic, dormir=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._reloj = reloj
+        self._dormir = dormir
+        self._tokens = capacity
+        self._ultimo = reloj()
+        self._lock = threading.Lock()
+    
+    def adquirir(self):
+        """Esperar hasta tener un token y consumirlo"""
+        while True:
+            with self._lock:
+                ahora = self._reloj()
+                self._tokens = min(self.capacity, self._tokens + (ahora - self._ultimo) * self.rate)
+                self._ultimo = ahora
+                # Margen de redondeo: sin él, una espera por debajo de la
+                # resolución del reloj podría no completar nunca el token
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate
+            self._dormir(espera)
+
+class FakeEmailService:
+    """Proveedor local: guarda los emails en memoria en vez de enviarlos"""
+    
+    def __init__(self, latencia=0.0, fallar=()):
+        self.latencia = latencia
+        self.fallar = set(fallar)
+        self.enviados = []
+        self._lock = threading.Lock()
+    
+    def send_email(self, to_email, subject, body_html, attachments=None):
+        if self.latencia:
+            time.sleep(self.latencia)
+        if to_email in self.fallar:
+            return False
+        with self._lock:
+            self.enviados.append((to_email, subject, body_html))
+        return True
+
+def entregar_emails(envios, email_service=None, max_workers=EMAIL_WORKERS, rate=EMAIL_RATE, burst=EMAIL_BURST,
+                    al_enviar=None, bucket=None):
+    """
+    Enviar emails en paralelo respetando la tasa del proveedor
+    
+    Args:
+        envios: iterable de (to_email, subject, body_html) o de
+            (to_email, subject, body_html, clave)
+        email_service: objeto con send_email (por defecto EmailService)
+        max_workers: hilos de envío
+        rate: emails por segundo (0 = sin límite)
+        burst: emails que pueden salir juntos antes de esperar
+        al_enviar: callback(clave o to_email) tras cada envío exitoso, desde
+            el hilo de envío (p. ej. para guardar un checkpoint)
+        bucket: TokenBucket a usar en lugar de uno nuevo con `rate` y `burst`
+    
+    Returns:
+        dict con 'enviados', 'fallidos' y 'errores' (lista de (to_email, motivo))
+    """
+    envios = list(envios)
+    resultado = {'enviados': 0, 'fallidos': 0, 'errores': []}
+    if not envios:
+        return resultado
+    
+    if email_service is None:
+        from notifications.email_service import EmailService
+        email_service = EmailService()
+    
+    # Los contadores del job se toman aquí: los hilos del pool no heredan el contexto
+    metricas = ejecucion_actual()
+    if bucket is None and rate > 0:
+        bucket = TokenBucket(rate, max(burst, 1))
+    lock = threading.Lock()
+    
+    def enviar(envio):
+        to_email, subject, body_html = envio[:3]
+        if bucket is not None:
+            bucket.adquirir()
+        try:
+            ok = email_service.send_email(to_email, subject, body_html)
+            motivo = None if ok else 'el proveedor rechazó el envío'
+        except Exception as e:
+            ok, motivo = False, str(e)
+        
+        with lock:
+            if ok:
+                resultado['enviados'] += 1
+            else:
+                resultado['fallidos'] += 1
+                resultado['errores'].append((to_email, motivo))
+        
+        if ok:
+            metricas.sumar(emails=1)
+            if al_enviar is not None:
+                try:
+                    al_enviar(envio[3] if len(envio) > 3 else to_email)
+                except Exception as e:
+                    print(f"❌ Error registrando el envío a {to_email}: {e}")
+        else:
+            metricas.sumar(errores=1)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(envios))), thread_name_prefix='email') as pool:
+        list(pool.map(enviar, envios))
+    
+    for to_email, motivo in resultado['errores']:
+        print(f"❌ Email a {to_email} no enviado: {motivo}")
+    return resultado
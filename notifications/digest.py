@@ -0,0 +1,106 @@
+"""
+Resumen (digest) de emails repetidos
+
+Cuando un supervisor guarda varias veces seguidas las horas de un
+trabajador, cada guardado generaba un email. EmailDigest retiene los
+emails por destinatario y clave durante NOTIF_DIGEST_SECONDS: si en ese
+tiempo llega otro con la misma clave reemplaza al anterior (el último
+refleja el estado completo) y al vencer la ventana se envía uno solo.
+"""
+import atexit
+import os
+import threading
+from notifications.email_service import EmailService
+
+DIGEST_WINDOW = int(os.getenv('NOTIF_DIGEST_SECONDS', '120'))
+
+class EmailDigest:
+    """Agrupa emails por (destinatario, clave) dentro de una ventana de tiempo"""
+    
+    def __init__(self, window=DIGEST_WINDOW, email_service=None):
+        self.window = window
+        self._email_service = email_service
+        self._pendientes = {}
+        self._timers = {}
+        self._lock = threading.Lock()
+        
+        # Contadores
+        self.encolados = 0
+        self.enviados = 0
+    
+    @property
+    def email_service(self):
+        if self._email_service is None:
+            self._email_service = EmailService()
+        return self._email_service
+    
+    def encolar(self, to_email, subject, body_html, clave=None):
+        """
+        Programar un email; los de la misma clave dentro de la ventana se reemplazan
+        
+        Args:
+            to_email: destinatario
+            subject: asunto
+            body_html: cuerpo completo
+            clave: tipo de email (por defecto el asunto)
+        
+        Returns:
+            True si se envió o quedó programado
+        """
+        if self.window <= 0:
+            return self.email_service.send_email(to_email, subject, body_html)
+        
+        llave = (to_email, clave or subject)
+        with self._lock:
+            self.encolados += 1
+            anterior = self._pendientes.get(llave)
+            veces = anterior['veces'] + 1 if anterior else 1
+            self._pendientes[llave] = {'subject': subject, 'body_html': body_html, 'veces': veces}
+            
+            if llave not in self._timers:
+                timer = threading.Timer(self.window, self._enviar, args=(llave,))
+                timer.daemon = True
+                self._timers[llave] = timer
+                timer.start()
+        return True
+    
+    def _enviar(self, llave):
+        with self._lock:
+            pendiente = self._pendientes.pop(llave, None)
+            self._timers.pop(llave, None)
+        if pendiente is None:
+            return False
+        
+        subject = pendiente['subject']
+        if pendiente['veces'] > 1:
+            subject += f" ({pendiente['veces']} actualizaciones)"
+        
+        enviado = self.email_service.send_email(llave[0], subject, pendiente['body_html'])
+        if enviado:
+            with self._lock:
+                self.enviados += 1
+        return enviado
+    
+    def flush(self):
+        """Enviar ya todo lo pendiente (se llama al salir del proceso)"""
+        with self._lock:
+            llaves = list(self._timers)
+            for llave in llaves:
+                self._timers[llave].cancel()
+        return sum(1 for llave in llaves if self._enviar(llave))
+    
+    def pendientes(self):
+        """Cantidad de emails programados"""
+        with self._lock:
+            return len(self._pendientes)
+
+# Singleton global
+_digest_instance = None
+
+def get_email_digest():
+    """Obtener el agrupador de emails (singleton)"""
+    global _digest_instance
+    if _digest_instance is None:
+        _digest_instance = EmailDigest()
+        atexit.register(_digest_instance.flush)
+    return _digest_instance
@@ -246,6 +246,19 @@ class EmailTemplates:
     def reporte_mensual(supervisor_nombre, area, estadisticas, mes, año):
         """Reporte mensual para supervisores"""
         
+        # Las filas de confirmación solo si las estadísticas las traen
+        filas_confirmacion = ""
+        if 'horas_confirmadas' in estadisticas:
+            filas_confirmacion = f"""
+                <tr>
+                    <td>Horas confirmadas</td>
+                    <td style="text-align: right;"><strong>{estadisticas['horas_confirmadas']}h</strong></td>
+                </tr>
+                <tr>
+                    <td>Tasa de confirmación</td>
+                    <td style="text-align: right;"><strong>{estadisticas.get('tasa_confirmacion', 0)}%</strong></td>
+                </tr>"""
+        
         content = f"""
         <p>Hola <strong>{supervisor_nombre}</strong>,</p>
         <p>Aquí está el reporte mensual del área de <strong>{area}</strong> para {mes} {año}:</p>
@@ -266,14 +279,7 @@ class EmailTemplates:
                     <td>Horas asignadas</td>
                     <td style="text-align: right;"><strong>{estadisticas.get('horas_asignadas', 0)}h</strong></td>
                 </tr>
-                <tr>
-                    <td>Horas confirmadas</td>
-                    <td style="text-align: right;"><strong>{estadisticas.get('horas_confirmadas', 0)}h</strong></td>
-                </tr>
-                <tr>
-                    <td>Tasa de confirmación</td>
-                    <td style="text-align: right;"><strong>{estadisticas.get('tasa_confirmacion', 0)}%</strong></td>
-                </tr>
+                {filas_confirmacion}
             </tbody>
         </table>
         
@@ -0,0 +1,131 @@
+"""
+Bus de eventos en memoria para notificaciones
+
+notifications.store publica en el tema del usuario cada vez que sus
+notificaciones cambian (nueva, leída, eliminada); database.workers_json
+publica en TOPIC_HORAS cada vez que se asignan horas. Cada sesión de Streamlit
+mantiene un Buzon suscrito a su usuario y solo vuelve a consultar SQLite
+cuando cambia la versión del buzón.
+
+El bus es por proceso: el scheduler corre dentro de la app y publica aquí.
+Los cambios hechos por otros procesos (scripts) se detectan por la versión
+del usuario en notification_unread (store.estado_usuario).
+"""
+import threading
+import weakref
+
+def topic_notificaciones(username):
+    """Tema de los cambios en las notificaciones de un usuario"""
+    return f"notificaciones:{username}"
+
+# Tema de los cambios de horas de cualquier trabajador
+# (payload: trabajador_id, año y, si se conocen, rubro_id y las horas nuevas)
+TOPIC_HORAS = "horas_cambiadas"
+
+class EventBus:
+    """Publicación/suscripción por tema, segura entre hilos"""
+    
+    def __init__(self):
+        self._suscriptores = {}
+        self._siguiente_id = 0
+        self._lock = threading.Lock()
+    
+    def subscribe(self, topic, callback):
+        """
+        Suscribir un callback(topic, **payload) a un tema
+        
+        Los métodos ligados se guardan con referencia débil: la suscripción
+        desaparece sola cuando se libera el objeto (p. ej. al cerrar la sesión).
+        
+        Returns:
+            id de suscripción para unsubscribe
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        with self._lock:
+            self._siguiente_id += 1
+            self._suscriptores.setdefault(topic, {})[self._siguiente_id] = ref
+            return self._siguiente_id
+    
+    def unsubscribe(self, topic, subscription_id):
+        """Cancelar una suscripción"""
+        with self._lock:
+            suscriptores = self._suscriptores.get(topic, {})
+            suscriptores.pop(subscription_id, None)
+            if not suscriptores:
+                self._suscriptores.pop(topic, None)
+    
+    def publish(self, topic, **payload):
+        """Llamar a los suscriptores del tema; devuelve cuántos recibieron el evento"""
+        with self._lock:
+            suscriptores = list(self._suscriptores.get(topic, {}).items())
+        
+        entregados = 0
+        for subscription_id, ref in suscriptores:
+            callback = ref()
+            if callback is None:
+                self.unsubscribe(topic, subscription_id)
+                continue
+            try:
+                callback(topic, **payload)
+                entregados += 1
+            except Exception as e:
+                print(f"❌ Error en suscriptor de {topic}: {e}")
+        return entregados
+    
+    def subscriber_count(self, topic):
+        """Suscriptores registrados en un tema"""
+        with self._lock:
+            return len(self._suscriptores.get(topic, {}))
+
+class Buzon:
+    """
+    Versión de las notificaciones de un usuario vista por una sesión
+    
+    `version` aumenta con cada evento recibido; quien guarda datos en caché
+    anota la versión con que los leyó y vuelve a consultar si cambió.
+    """
+    
+    def __init__(self, username, bus=None):
+        self.username = username
+        self.version = 0
+        self._lock = threading.Lock()
+        self._bus = bus or get_event_bus()
+        self._topic = topic_notificaciones(username)
+        self._subscription_id = self._bus.subscribe(self._topic, self._recibir)
+    
+    def _recibir(self, topic, **payload):
+        self.marcar()
+    
+    def marcar(self):
+        """Invalidar lo leído con la versión actual"""
+        with self._lock:
+            self.version += 1
+    
+    def cerrar(self):
+        """Cancelar la suscripción"""
+        self._bus.unsubscribe(self._topic, self._subscription_id)
+
+# Singleton global
+_bus_instance = None
+_bus_lock = threading.Lock()
+
+def get_event_bus():
+    """Obtener el bus de eventos (singleton)"""
+    global _bus_instance
+    if _bus_instance is None:
+        with _bus_lock:
+            if _bus_instance is None:
+                _bus_instance = EventBus()
+    return _bus_instance
+
+def publicar_cambio(username, evento, **payload):
+    """Avisar a las sesiones de `username` que sus notificaciones cambiaron"""
+    return get_event_bus().publish(topic_notificaciones(username), evento=evento, **payload)
+
+def publicar_horas_cambiadas(trabajador_id, año, rubro_id=None, horas=None):
+    """Avisar que cambiaron las horas de un trabajador en un año (en un rubro, si se indica)"""
+    return get_event_bus().publish(
+        TOPIC_HORAS, trabajador_id=int(trabajador_id), año=int(año),
+        rubro_id=None if rubro_id is None else int(rubro_id),
+        horas=None if horas is None else float(horas)
+    )
@@ -1,127 +1,32 @@
 """
 Sistema de notificaciones in-app
-"""
-import sqlite3
-from datetime import datetime
-import pandas as pd
-from pathlib import Path
-
-DB_PATH = Path(__file__).parent.parent / 'notifications.db'
 
-def init_notifications_db():
-    """Crear tabla de notificaciones"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            username TEXT,
-            timestamp TEXT NOT NULL,
-            type TEXT NOT NULL,
-            title TEXT NOT NULL,
-            message TEXT NOT NULL,
-            read INTEGER DEFAULT 0,
-            link TEXT,
-            icon TEXT DEFAULT '📢'
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+Interfaz para las páginas; las notificaciones se guardan en el almacén
+único de notifications.store.
+"""
+from notifications import store
+from notifications.store import (
+    DB_PATH,
+    init_notifications_db,
+    get_unread_count,
+    get_notifications_page,
+    mark_notification_read,
+    mark_all_read,
+    mark_read_many,
+    delete_notification,
+    delete_many,
+    delete_old_notifications,
+)
 
 def add_notification(user_id, username, type, title, message, link=None, icon="📢"):
     """Agregar notificación"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute('''
-        INSERT INTO notifications 
-        (user_id, username, timestamp, type, title, message, link, icon)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (user_id, username, datetime.now().isoformat(), type, title, message, link, icon))
-    
-    notification_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    
-    return notification_id
+    return store.add_notification(
+        username, type, title, message, link=link, icon=icon, user_id=user_id or None
+    )
 
 def get_user_notifications(username, unread_only=False):
     """Obtener notificaciones del usuario"""
-    conn = sqlite3.connect(str(DB_PATH))
-    
-    query = "SELECT * FROM notifications WHERE username = ?"
-    params = [username]
-    
-    if unread_only:
-        query += " AND read = 0"
-    
-    query += " ORDER BY timestamp DESC LIMIT 50"
-    
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    
-    return df
-
-def mark_notification_read(notification_id):
-    """Marcar notificación como leída"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute("UPDATE notifications SET read = 1 WHERE id = ?", (notification_id,))
-    
-    conn.commit()
-    conn.close()
-
-def mark_all_read(username):
-    """Marcar todas las notificaciones como leídas"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute("UPDATE notifications SET read = 1 WHERE username = ?", (username,))
-    
-    conn.commit()
-    conn.close()
-
-def delete_notification(notification_id):
-    """Eliminar notificación"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
-    
-    conn.commit()
-    conn.close()
-
-def get_unread_count(username):
-    """Obtener cantidad de notificaciones sin leer"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute("SELECT COUNT(*) FROM notifications WHERE username = ? AND read = 0", (username,))
-    
-    count = c.fetchone()[0]
-    conn.close()
-    
-    return count
-
-def delete_old_notifications(days=30):
-    """Eliminar notificaciones antiguas"""
-    conn = sqlite3.connect(str(DB_PATH))
-    c = conn.cursor()
-    
-    c.execute("""
-        DELETE FROM notifications
-        WHERE DATE(timestamp) < DATE('now', ?)
-    """, (f'-{days} days',))
-    
-    deleted = c.rowcount
-    conn.commit()
-    conn.close()
-    
-    return deleted
+    return store.get_user_notifications(username, unread_only=unread_only, limit=50)
 
 # Funciones de conveniencia para crear notificaciones comunes
 
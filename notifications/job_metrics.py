@@ -0,0 +1,160 @@
+"""
+Telemetría de los jobs del scheduler
+
+Cada ejecución de un job (envuelto con medir_job) deja una fila en
+job_runs (notifications.db) con inicio, fin, duración, ítems procesados,
+emails y WhatsApps enviados y errores. Dentro del job se suman los
+contadores con ejecucion_actual().sumar(...); fuera de un job medido la
+llamada no hace nada.
+"""
+import sqlite3
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from notifications import store
+
+JOB_RUNS_SQL = '''
+    CREATE TABLE IF NOT EXISTS job_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id TEXT NOT NULL,
+        inicio TEXT NOT NULL,
+        fin TEXT,
+        duracion REAL,
+        procesados INTEGER DEFAULT 0,
+        emails INTEGER DEFAULT 0,
+        whatsapps INTEGER DEFAULT 0,
+        errores INTEGER DEFAULT 0,
+        estado TEXT,
+        error TEXT
+    )
+'''
+
+CONTADORES = ('procesados', 'emails', 'whatsapps', 'errores')
+
+class EjecucionJob:
+    """Contadores de una ejecución; sumar() es seguro entre hilos"""
+    
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.contadores = dict.fromkeys(CONTADORES, 0)
+        self._lock = threading.Lock()
+    
+    def sumar(self, **cantidades):
+        """Sumar a los contadores (procesados, emails, whatsapps, errores)"""
+        with self._lock:
+            for nombre, cantidad in cantidades.items():
+                self.contadores[nombre] += int(cantidad)
+
+_ejecucion = ContextVar('job_ejecucion', default=None)
+
+def ejecucion_actual():
+    """Ejecución medida del contexto actual (o una descartable si no hay)"""
+    return _ejecucion.get() or EjecucionJob(None)
+
+def _conectar():
+    conn = sqlite3.connect(str(store.DB_PATH), timeout=30)
+    conn.execute(JOB_RUNS_SQL)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_job_runs_job_inicio ON job_runs(job_id, inicio)')
+    return conn
+
+def registrar_ejecucion(job_id, inicio, fin, duracion, contadores, estado, error=None):
+    """Guardar una ejecución en job_runs; devuelve su id"""
+    conn = _conectar()
+    try:
+        with conn:
+            cursor = conn.execute('''
+                INSERT INTO job_runs
+                (job_id, inicio, fin, duracion, procesados, emails, whatsapps, errores, estado, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                job_id, inicio, fin, duracion,
+                contadores['procesados'], contadores['emails'], contadores['whatsapps'], contadores['errores'],
+                estado, error
+            ))
+            return cursor.lastrowid
+    finally:
+        conn.close()
+
+def medir_job(job_id, funcion):
+    """
+    Envolver `funcion` para registrar cada ejecución en job_runs
+    
+    Las excepciones se registran (estado 'error') y se vuelven a lanzar
+    para que APScheduler las siga reportando.
+    """
+    @wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        ejecucion = EjecucionJob(job_id)
+        token = _ejecucion.set(ejecucion)
+        inicio = datetime.now()
+        t0 = time.perf_counter()
+        estado, error = 'ok', None
+        try:
+            return funcion(*args, **kwargs)
+        except Exception:
+            estado, error = 'error', traceback.format_exc(limit=5)
+            ejecucion.sumar(errores=1)
+            raise
+        finally:
+            _ejecucion.reset(token)
+            try:
+                registrar_ejecucion(
+                    job_id, inicio.isoformat(), datetime.now().isoformat(),
+                    time.perf_counter() - t0, ejecucion.contadores, estado, error
+                )
+            except Exception as e:
+                print(f"❌ Error registrando métricas de {job_id}: {e}")
+    return envoltorio
+
+def get_job_runs(job_id=None, desde=None, limit=500):
+    """Ejecuciones registradas, de la más reciente a la más antigua (DataFrame)"""
+    import pandas as pd
+    
+    query = "SELECT * FROM job_runs WHERE 1=1"
+    params = []
+    if job_id:
+        query += " AND job_id = ?"
+        params.append(job_id)
+    if desde:
+        query += " AND inicio >= ?"
+        params.append(desde)
+    query += " ORDER BY inicio DESC LIMIT ?"
+    params.append(int(limit))
+    
+    conn = _conectar()
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+def get_job_summary(desde=None):
+    """Resumen por job: ejecuciones, fallos, duración media/máxima y última ejecución (DataFrame)"""
+    import pandas as pd
+    
+    query = '''
+        SELECT job_id,
+               COUNT(*) AS ejecuciones,
+               SUM(estado = 'error') AS fallos,
+               SUM(errores) AS errores,
+               AVG(duracion) AS duracion_media,
+               MAX(duracion) AS duracion_max,
+               SUM(procesados) AS procesados,
+               SUM(emails) AS emails,
+               SUM(whatsapps) AS whatsapps,
+               MAX(inicio) AS ultima
+        FROM job_runs
+    '''
+    params = []
+    if desde:
+        query += " WHERE inicio >= ?"
+        params.append(desde)
+    query += " GROUP BY job_id ORDER BY job_id"
+    
+    conn = _conectar()
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
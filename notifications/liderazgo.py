@@ -0,0 +1,67 @@
+"""
+Elección de líder entre procesos con un candado de archivo
+
+Con varios procesos de Streamlit sobre la misma carpeta, solo el que
+obtiene el candado exclusivo de SCHEDULER_LOCK_FILE ejecuta los jobs. El
+sistema operativo libera el candado si el proceso muere, así otro puede
+tomar el relevo.
+"""
+import os
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows
+    import msvcrt
+    FCNTL_AVAILABLE = False
+
+class CandadoLider:
+    """Candado exclusivo y no bloqueante sobre un archivo"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._archivo = None
+    
+    @property
+    def tomado(self):
+        """True si este proceso tiene el candado"""
+        return self._archivo is not None
+    
+    def adquirir(self):
+        """Intentar tomar el candado sin esperar; devuelve True si este proceso es el líder"""
+        if self._archivo is not None:
+            return True
+        
+        archivo = open(self.path, 'a+')
+        try:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            archivo.close()
+            return False
+        
+        # PID del líder, para diagnóstico
+        archivo.seek(0)
+        archivo.truncate()
+        archivo.write(f"{os.getpid()}\n")
+        archivo.flush()
+        self._archivo = archivo
+        return True
+    
+    def liberar(self):
+        """Soltar el candado si se tiene"""
+        if self._archivo is None:
+            return
+        try:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self._archivo.seek(0)
+                msvcrt.locking(self._archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._archivo.close()
+            self._archivo = None
@@ -0,0 +1,176 @@
+"""
+Recordatorio semanal repartido en shards
+
+En vez de enviar a todos los trabajadores a la misma hora, cada username
+cae en un shard fijo (crc32 del username) y cada shard es un job propio
+escalonado dentro de la ventana RECORDATORIO_VENTANA_MINUTOS desde las
+RECORDATORIO_HORA del lunes.
+
+Cada destinatario enviado queda en envios_progreso (notifications.db)
+bajo la clave de la semana; si una ejecución se corta, al reanudarla se
+salta a quienes ya recibieron el recordatorio. La notificación in-app y
+el email llevan checkpoints separados (claves 'recordatorio_semanal_app'
+y 'recordatorio_semanal'): la notificación se crea aunque el email no
+esté configurado o falle.
+"""
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from notifications import store
+
+RECORDATORIO_SHARDS = int(os.getenv('RECORDATORIO_SHARDS', '6'))
+RECORDATORIO_VENTANA_MINUTOS = int(os.getenv('RECORDATORIO_VENTANA_MINUTOS', '60'))
+RECORDATORIO_HORA = os.getenv('RECORDATORIO_HORA', '09:00')
+
+PROGRESO_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS envios_progreso (
+        ejecucion TEXT NOT NULL,
+        username TEXT NOT NULL,
+        enviado TEXT NOT NULL,
+        PRIMARY KEY (ejecucion, username)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS envios_ejecuciones (
+        ejecucion TEXT NOT NULL,
+        shard INTEGER NOT NULL,
+        total INTEGER,
+        estado TEXT NOT NULL,
+        inicio TEXT,
+        fin TEXT,
+        PRIMARY KEY (ejecucion, shard)
+    )
+    ''',
+]
+
+# ==================== SHARDS ====================
+
+def shard_de(username, shards=RECORDATORIO_SHARDS):
+    """Shard fijo del username (crc32: igual en todos los procesos, a diferencia de hash())"""
+    return zlib.crc32(username.encode('utf-8')) % shards
+
+def horario_shard(shard, shards=RECORDATORIO_SHARDS, ventana=RECORDATORIO_VENTANA_MINUTOS, hora=RECORDATORIO_HORA):
+    """
+    Inicio del shard, repartidos en partes iguales dentro de la ventana
+    
+    Returns:
+        (días después del lunes, hora, minuto): si la ventana pasa de
+        medianoche, los shards siguientes caen al día siguiente
+    """
+    h, m = (int(x) for x in hora.split(':'))
+    inicio = h * 60 + m + (shard * ventana) // shards
+    return inicio // (24 * 60), (inicio // 60) % 24, inicio % 60
+
+def clave_semana(fecha=None, nombre='recordatorio_semanal'):
+    """Clave de la ejecución semanal, p. ej. 'recordatorio_semanal:2025-W03'"""
+    año, semana, _ = (fecha or datetime.now()).isocalendar()
+    return f"{nombre}:{año}-W{semana:02d}"
+
+# ==================== PROGRESO ====================
+
+def _conectar():
+    conn = sqlite3.connect(str(store.DB_PATH), timeout=30)
+    for sql in PROGRESO_SQL:
+        conn.execute(sql)
+    return conn
+
+def iniciar_ejecucion(ejecucion, shard, total):
+    """Marcar el shard como en curso (conserva el inicio si es una reanudación)"""
+    conn = _conectar()
+    try:
+        with conn:
+            conn.execute('''
+                INSERT INTO envios_ejecuciones (ejecucion, shard, total, estado, inicio)
+                VALUES (?, ?, ?, 'en_curso', ?)
+                ON CONFLICT(ejecucion, shard) DO UPDATE SET
+                    total = excluded.total, estado = 'en_curso', fin = NULL
+            ''', (ejecucion, shard, total, datetime.now().isoformat()))
+    finally:
+        conn.close()
+
+def finalizar_ejecucion(ejecucion, shard):
+    """Marcar el shard como completado"""
+    conn = _conectar()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE envios_ejecuciones SET estado = 'completado', fin = ? WHERE ejecucion = ? AND shard = ?",
+                (datetime.now().isoformat(), ejecucion, shard)
+            )
+    finally:
+        conn.close()
+
+def ejecuciones_incompletas(ejecucion):
+    """Shards de `ejecucion` que quedaron en curso (proceso caído o detenido)"""
+    conn = _conectar()
+    try:
+        return [fila[0] for fila in conn.execute(
+            "SELECT shard FROM envios_ejecuciones WHERE ejecucion = ? AND estado = 'en_curso' ORDER BY shard",
+            (ejecucion,)
+        )]
+    finally:
+        conn.close()
+
+def ya_enviados(ejecucion):
+    """Usernames que ya recibieron el envío de `ejecucion`"""
+    conn = _conectar()
+    try:
+        return {fila[0] for fila in conn.execute(
+            "SELECT username FROM envios_progreso WHERE ejecucion = ?", (ejecucion,)
+        )}
+    finally:
+        conn.close()
+
+def marcar_enviado(ejecucion, username):
+    """
+    Checkpoint: `username` ya recibió el envío (se llama desde los hilos de envío)
+    
+    Returns:
+        True si es el primer checkpoint de `username` en `ejecucion`
+    """
+    conn = _conectar()
+    try:
+        with conn:
+            return conn.execute(
+                "INSERT OR IGNORE INTO envios_progreso (ejecucion, username, enviado) VALUES (?, ?, ?)",
+                (ejecucion, username, datetime.now().isoformat())
+            ).rowcount == 1
+    finally:
+        conn.close()
+
+def checkpoint_notificaciones(ejecucion):
+    """
+    Filtro para store.add_notifications_bulk: marca cada username en
+    envios_progreso dentro de la misma transacción y deja pasar solo las
+    notificaciones que aún no se habían creado en `ejecucion`
+    """
+    def filtro(conn, notificaciones):
+        for sql in PROGRESO_SQL:
+            conn.execute(sql)
+        ahora = datetime.now().isoformat()
+        return [
+            n for n in notificaciones
+            if conn.execute(
+                "INSERT OR IGNORE INTO envios_progreso (ejecucion, username, enviado) VALUES (?, ?, ?)",
+                (ejecucion, n['username'], ahora)
+            ).rowcount == 1
+        ]
+    return filtro
+
+def limpiar_progreso(semanas=8):
+    """Eliminar el progreso de ejecuciones de hace más de `semanas` semanas"""
+    limite = clave_semana(datetime.now() - timedelta(weeks=semanas), nombre='')
+    conn = _conectar()
+    try:
+        with conn:
+            borradas = conn.execute(
+                "DELETE FROM envios_progreso WHERE substr(ejecucion, instr(ejecucion, ':')) < ?", (limite,)
+            ).rowcount
+            conn.execute(
+                "DELETE FROM envios_ejecuciones WHERE substr(ejecucion, instr(ejecucion, ':')) < ?", (limite,)
+            )
+        return borradas
+    finally:
+        conn.close()
@@ -0,0 +1,121 @@
+"""
+Preparación del reporte mensual por área
+
+Las estadísticas de todas las áreas salen de una sola agregación sobre
+los stores JSON de horas y trabajadores; el HTML de cada área se arma
+una vez y se reutiliza. Todo queda en caché hasta que cambian los
+archivos, así cada email del job solo cuesta el envío.
+
+Las horas no tienen todavía un campo de confirmación, así que el reporte
+no incluye horas confirmadas ni tasa de confirmación.
+"""
+import threading
+from notifications.email_templates import EmailTemplates
+from notifications.sobrecargas import LIMITE_HORAS, calcular_totales
+
+ESTADISTICAS_VACIAS = {
+    'total_trabajadores': 0,
+    'horas_asignadas': 0,
+    'sobrecargados': 0,
+    'estado': 'Normal'
+}
+
+def estadisticas_por_area(horas, trabajadores, año, limite=LIMITE_HORAS):
+    """
+    Estadísticas de cada área de los trabajadores activos
+    
+    Args:
+        horas: lista de registros de horas_asignadas
+        trabajadores: lista de registros de trabajadores
+        año: año del reporte
+        limite: límite para quien no tiene `limite_horas`
+    
+    Returns:
+        dict área → estadísticas (claves de ESTADISTICAS_VACIAS); la clave
+        None tiene el total de todas las áreas
+    """
+    totales = calcular_totales(horas, trabajadores, año, limite)
+    totales['sobrecargado'] = totales['horas_totales'] > totales['limite']
+    totales['area'] = totales['area'].fillna('Sin área')
+    
+    por_area = totales.groupby('area').agg(
+        total_trabajadores=('trabajador_id', 'count'),
+        horas_asignadas=('horas_totales', 'sum'),
+        sobrecargados=('sobrecargado', 'sum'),
+    )
+    filas = list(por_area.iterrows()) + [(None, por_area.sum())]
+    
+    estadisticas = {}
+    for area, fila in filas:
+        sobrecargados = int(fila['sobrecargados'])
+        estadisticas[area] = {
+            'total_trabajadores': int(fila['total_trabajadores']),
+            'horas_asignadas': round(float(fila['horas_asignadas']), 1),
+            'sobrecargados': sobrecargados,
+            'estado': f'{sobrecargados} trabajador(es) con sobrecarga' if sobrecargados else 'Normal'
+        }
+    return estadisticas
+
+class ReporteMensual:
+    """Estadísticas de un mes y HTML ya renderizado por área y supervisor"""
+    
+    def __init__(self, mes, año, estadisticas):
+        self.mes = mes
+        self.año = año
+        self.estadisticas = estadisticas
+        self._html = {}
+        self._lock = threading.Lock()
+    
+    def estadisticas_area(self, area):
+        """Estadísticas del área (None = todas las áreas)"""
+        return self.estadisticas.get(area, ESTADISTICAS_VACIAS)
+    
+    def html(self, area, supervisor_nombre):
+        """HTML del email; se renderiza una sola vez por (área, supervisor)"""
+        clave = (area, supervisor_nombre)
+        with self._lock:
+            if clave not in self._html:
+                self._html[clave] = EmailTemplates.reporte_mensual(
+                    supervisor_nombre,
+                    area or 'todas las áreas',
+                    self.estadisticas_area(area),
+                    self.mes,
+                    self.año
+                )
+            return self._html[clave]
+
+# Caché por (mes, año): se descarta si cambian los archivos de horas o trabajadores
+_reportes = {}
+_reportes_lock = threading.Lock()
+
+def _firma_stores():
+    from database import workers_json
+    
+    return tuple(
+        ruta.stat().st_mtime_ns if ruta.exists() else None
+        for ruta in (workers_json.HORAS_FILE, workers_json.TRABAJADORES_FILE)
+    )
+
+def preparar_reporte_mensual(mes, año):
+    """
+    Reporte del mes listo para enviar (de la caché si los stores no cambiaron)
+    
+    Returns:
+        ReporteMensual
+    """
+    from database.workers_json import leer_horas, leer_trabajadores
+    
+    firma = _firma_stores()
+    with _reportes_lock:
+        guardado = _reportes.get((mes, año))
+        if guardado is not None and guardado[0] == firma:
+            return guardado[1]
+    
+    reporte = ReporteMensual(mes, año, estadisticas_por_area(
+        leer_horas()['horas_asignadas'],
+        leer_trabajadores()['trabajadores'],
+        año
+    ))
+    with _reportes_lock:
+        _reportes[(mes, año)] = (firma, reporte)
+    return reporte
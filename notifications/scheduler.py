@@ -5,117 +5,270 @@ Gestión de recordatorios y notificaciones programadas
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime, timedelta
-import streamlit as st
+from pathlib import Path
+import os
+import threading
+from notifications.job_metrics import medir_job, ejecucion_actual
+from notifications.liderazgo import CandadoLider
+from notifications.recordatorios import (
+    RECORDATORIO_SHARDS, horario_shard, clave_semana, ejecuciones_incompletas
+)
+
+DIAS_SEMANA = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+from notifications.sobrecargas import get_verificador_sobrecargas
+
+try:
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    SQLALCHEMY_AVAILABLE = True
+except ImportError:
+    SQLALCHEMY_AVAILABLE = False
+    print("⚠️ SQLAlchemy no instalado: los jobs se guardan en memoria. Para instalar: pip install SQLAlchemy")
+
+BASE_DIR = Path(__file__).parent.parent
+
+# Job store persistente: los jobs y su próxima ejecución sobreviven a los reinicios
+JOBSTORE_URL = os.getenv('SCHEDULER_JOBSTORE_URL', f"sqlite:///{BASE_DIR / 'scheduler.db'}")
+# Candado de archivo: solo el proceso que lo obtiene ejecuta los jobs
+LOCK_FILE = os.getenv('SCHEDULER_LOCK_FILE', str(BASE_DIR / 'scheduler.lock'))
+# Segundos que un proceso en espera tarda en volver a intentar ser líder
+LEADER_RETRY = int(os.getenv('SCHEDULER_LEADER_RETRY_SECONDS', '60'))
+
+# Ejecuciones perdidas (proceso caído, reinicio): se corren si no pasaron más
+# de MISFIRE_GRACE_TIME segundos y, con COALESCE, varias pendientes cuentan como una
+MISFIRE_GRACE_TIME = int(os.getenv('SCHEDULER_MISFIRE_GRACE_SECONDS', '3600'))
+COALESCE = os.getenv('SCHEDULER_COALESCE', 'true').lower() in ('1', 'true', 'yes', 'si', 'sí')
+
+# ==================== JOBS ====================
+# Funciones de módulo: el job store guarda la referencia
+# ('notifications.scheduler:recordatorio_semanal'), no un método ligado
+
+def recordatorio_semanal(shard=None):
+    return medir_job('recordatorio_semanal', get_scheduler().enviar_recordatorio_semanal)(shard)
+
+def reporte_mensual():
+    return medir_job('reporte_mensual', get_scheduler().enviar_reporte_mensual)()
+
+def verificar_sobrecargas():
+    return medir_job('verificar_sobrecargas', get_scheduler().verificar_sobrecargas)()
+
+def limpiar_notificaciones():
+    return medir_job('limpiar_notificaciones', get_scheduler().limpiar_notificaciones_antiguas)()
+
+def archivar_auditoria():
+    return medir_job('archivar_auditoria', get_scheduler().archivar_auditoria)()
+
+def definir_jobs():
+    """(id, nombre, función, trigger, args) de cada job programado"""
+    # Recordatorio semanal - Lunes desde las 9:00 AM, un job por shard
+    # escalonado dentro de la ventana
+    jobs = []
+    for shard in range(RECORDATORIO_SHARDS):
+        dias, hora, minuto = horario_shard(shard)
+        jobs.append((
+            f'recordatorio_semanal_{shard}', f'Recordatorio Semanal ({shard + 1}/{RECORDATORIO_SHARDS})',
+            recordatorio_semanal, CronTrigger(day_of_week=DIAS_SEMANA[dias % 7], hour=hora, minute=minuto), [shard]
+        ))
+    
+    return jobs + [
+        # Reporte mensual - Primer día del mes a las 8:00 AM
+        ('reporte_mensual', 'Reporte Mensual', reporte_mensual,
+         CronTrigger(day=1, hour=8, minute=0), []),
+        
+        # Verificar sobrecargas - Barrido diario; los cambios hechos desde
+        # la app los evalúa al momento el VerificadorSobrecargas
+        ('verificar_sobrecargas', 'Verificación de Sobrecargas', verificar_sobrecargas,
+         IntervalTrigger(hours=24), []),
+        
+        # Limpiar notificaciones antiguas - Diario a las 2:00 AM
+        ('limpiar_notificaciones', 'Limpieza de Notificaciones', limpiar_notificaciones,
+         CronTrigger(hour=2, minute=0), []),
+        
+        # Archivar auditoría por meses - Primer día del mes a las 3:00 AM
+        ('archivar_auditoria', 'Archivo de Auditoría', archivar_auditoria,
+         CronTrigger(day=1, hour=3, minute=0), []),
+    ]
 
 class NotificationScheduler:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
+    def __init__(self, jobstore_url=JOBSTORE_URL, lock_file=LOCK_FILE):
+        jobstores = {'default': SQLAlchemyJobStore(url=jobstore_url)} if SQLALCHEMY_AVAILABLE else {}
+        self.scheduler = BackgroundScheduler(
+            jobstores=jobstores,
+            job_defaults={
+                'coalesce': COALESCE,
+                'misfire_grace_time': MISFIRE_GRACE_TIME,
+                'max_instances': 1
+            }
+        )
+        self.lider = CandadoLider(lock_file)
+        self._detener = threading.Event()
+        self._espera = None
+        # start() se llama desde cada sesión nueva de Streamlit
+        self._lock = threading.Lock()
         self.jobs = {}
     
+    @property
+    def es_lider(self):
+        """True si este proceso ejecuta los jobs"""
+        return self.lider.tomado
+    
+    @property
+    def en_espera(self):
+        """True si otro proceso es el líder y este espera para relevarlo"""
+        return self._espera is not None and self._espera.is_alive()
+    
     def start(self):
-        """Iniciar scheduler"""
-        if not self.scheduler.running:
-            # Recordatorio semanal - Lunes a las 9:00 AM
-            self.scheduler.add_job(
-                self.enviar_recordatorio_semanal,
-                CronTrigger(day_of_week='mon', hour=9, minute=0),
-                id='recordatorio_semanal',
-                name='Recordatorio Semanal'
-            )
-            
-            # Reporte mensual - Primer día del mes a las 8:00 AM
-            self.scheduler.add_job(
-                self.enviar_reporte_mensual,
-                CronTrigger(day=1, hour=8, minute=0),
-                id='reporte_mensual',
-                name='Reporte Mensual'
-            )
+        """Iniciar scheduler (solo corre los jobs si este proceso es el líder)"""
+        with self._lock:
+            if self.scheduler.running or self.en_espera:
+                return
             
-            # Verificar sobrecargas - Cada 6 horas
-            self.scheduler.add_job(
-                self.verificar_sobrecargas,
-                'interval',
-                hours=6,
-                id='verificar_sobrecargas',
-                name='Verificación de Sobrecargas'
-            )
-            
-            # Limpiar notificaciones antiguas - Diario a las 2:00 AM
+            self._detener.clear()
+            if self.lider.adquirir():
+                self._iniciar_jobs()
+            else:
+                print("ℹ️ Otro proceso ejecuta el scheduler; este queda en espera")
+                self._espera = threading.Thread(target=self._esperar_liderazgo, name='scheduler-lider', daemon=True)
+                self._espera.start()
+    
+    def _iniciar_jobs(self):
+        """Arrancar APScheduler y registrar los jobs que falten en el job store"""
+        # En pausa mientras se sincronizan los jobs: las ejecuciones perdidas
+        # se evalúan al reanudar, con la política de misfire/coalesce
+        self.scheduler.start(paused=True)
+        
+        definidos = definir_jobs()
+        ids = {job_id for job_id, *_ in definidos}
+        
+        # Jobs guardados que ya no existen (p. ej. al cambiar RECORDATORIO_SHARDS)
+        for job in self.scheduler.get_jobs():
+            if job.id not in ids:
+                self.scheduler.remove_job(job.id)
+        
+        for job_id, nombre, funcion, trigger, args in definidos:
+            job = self.scheduler.get_job(job_id)
+            if job is None:
+                self.scheduler.add_job(funcion, trigger, args=args, id=job_id, name=nombre)
+            else:
+                # Conservar la próxima ejecución guardada (y la pausa, si la hay)
+                self.scheduler.modify_job(job_id, func=funcion, args=args, name=nombre)
+                if str(job.trigger) != str(trigger):
+                    self.scheduler.reschedule_job(job_id, trigger=trigger)
+        
+        # Shards del recordatorio de esta semana que quedaron a medias:
+        # se reanudan ya, saltando a quienes tienen checkpoint
+        for shard in ejecuciones_incompletas(clave_semana()):
             self.scheduler.add_job(
-                self.limpiar_notificaciones_antiguas,
-                CronTrigger(hour=2, minute=0),
-                id='limpiar_notificaciones',
-                name='Limpieza de Notificaciones'
+                recordatorio_semanal, 'date', args=[None if shard < 0 else shard],
+                id=f'reanudar_recordatorio_{shard}', name=f'Reanudar Recordatorio Semanal ({shard})',
+                replace_existing=True
             )
-            
-            self.scheduler.start()
-            print("✅ Scheduler iniciado")
+            print(f"↩️ Reanudando recordatorio semanal, shard {shard}")
+        
+        self.scheduler.resume()
+        print("✅ Scheduler iniciado")
+    
+    def _esperar_liderazgo(self):
+        while not self._detener.wait(LEADER_RETRY):
+            if self.lider.adquirir():
+                print("👑 Este proceso pasa a ejecutar el scheduler")
+                self._iniciar_jobs()
+                return
     
     def stop(self):
         """Detener scheduler"""
+        self._detener.set()
         if self.scheduler.running:
             self.scheduler.shutdown()
             print("🛑 Scheduler detenido")
+        self.lider.liberar()
     
-    def enviar_recordatorio_semanal(self):
-        """Enviar recordatorio semanal a todos los trabajadores"""
-        from database.notifications import add_notification
-        from notifications.email_service import EmailService
+    def enviar_recordatorio_semanal(self, shard=None, email_service=None):
+        """
+        Enviar recordatorio semanal a todos los trabajadores
+        
+        Args:
+            shard: solo los usernames de este shard (None = todos)
+            email_service: proveedor de email (por defecto EmailService)
+        """
+        from notifications import recordatorios
+        from notifications.delivery import entregar_emails
         from notifications.email_templates import EmailTemplates
+        from notifications.store import add_notifications_bulk
         from auth import load_config
         
-        print(f"📅 [{datetime.now()}] Enviando recordatorios semanales...")
+        print(f"📅 [{datetime.now()}] Enviando recordatorios semanales (shard {shard})...")
         
         config = load_config()
-        email_service = EmailService()
+        metricas = ejecucion_actual()
         
-        # Obtener todos los trabajadores
-        trabajadores = config['credentials']['usernames']
+        # Trabajadores del shard
+        trabajadores = {
+            username: user_data for username, user_data in config['credentials']['usernames'].items()
+            if user_data['role'] == 'trabajador'
+            and (shard is None or recordatorios.shard_de(username) == shard)
+        }
         
+        # Checkpoints de la semana: una reanudación salta a quienes ya recibieron el envío
+        ejecucion = recordatorios.clave_semana()
+        ejecucion_app = recordatorios.clave_semana(nombre='recordatorio_semanal_app')
+        enviados = recordatorios.ya_enviados(ejecucion)
+        recordatorios.iniciar_ejecucion(ejecucion, -1 if shard is None else shard, len(trabajadores))
+        
+        notificaciones = []
+        envios = []
         for username, user_data in trabajadores.items():
-            if user_data['role'] == 'trabajador':
-                # Aquí deberías calcular horas pendientes reales
-                # Por ahora usamos un placeholder
-                horas_pendientes = 0  # Implementar lógica real
+            metricas.sumar(procesados=1)
+            
+            # Aquí deberías calcular horas pendientes reales
+            # Por ahora usamos un placeholder
+            horas_pendientes = 0  # Implementar lógica real
+            
+            if horas_pendientes > 0:
+                # Notificación in-app (con su propio checkpoint)
+                notificaciones.append({
+                    'username': username,
+                    'type': 'reminder',
+                    'title': '📅 Recordatorio Semanal',
+                    'message': f'Tienes {horas_pendientes}h pendientes de confirmar',
+                    'icon': '⏰',
+                    'priority': 'normal'
+                })
                 
-                if horas_pendientes > 0:
-                    # Notificación in-app
-                    add_notification(
-                        username,
-                        'reminder',
-                        '📅 Recordatorio Semanal',
-                        f'Tienes {horas_pendientes}h pendientes de confirmar',
-                        icon='⏰',
-                        priority='normal'
-                    )
-                    
-                    # Email
-                    html = EmailTemplates.recordatorio_semanal(
-                        user_data['name'],
-                        horas_pendientes,
-                        "31 de Diciembre"
-                    )
-                    
-                    email_service.send_email(
-                        user_data['email'],
-                        "Recordatorio: Horas pendientes",
-                        html
-                    )
-        
-        print("✅ Recordatorios semanales enviados")
+                if username in enviados:
+                    continue
+                
+                # Email
+                html = EmailTemplates.recordatorio_semanal(
+                    user_data['name'],
+                    horas_pendientes,
+                    "31 de Diciembre"
+                )
+                envios.append((user_data['email'], "Recordatorio: Horas pendientes", html, username))
+        
+        # Cada notificación se crea una sola vez por semana, aunque el email falle
+        add_notifications_bulk(notificaciones, filtro=recordatorios.checkpoint_notificaciones(ejecucion_app))
+        resultado = entregar_emails(
+            envios, email_service,
+            al_enviar=lambda username: recordatorios.marcar_enviado(ejecucion, username)
+        )
+        recordatorios.finalizar_ejecucion(ejecucion, -1 if shard is None else shard)
+        
+        print(f"✅ Recordatorios semanales enviados: {resultado['enviados']} ({resultado['fallidos']} fallidos, "
+              f"{len(enviados & set(trabajadores))} ya enviados antes)")
     
-    def enviar_reporte_mensual(self):
+    def enviar_reporte_mensual(self, email_service=None):
         """Enviar reporte mensual a supervisores"""
-        from database.notifications import add_notification
-        from notifications.email_service import EmailService
-        from notifications.email_templates import EmailTemplates
+        from notifications.delivery import entregar_emails
+        from notifications.reportes import preparar_reporte_mensual
+        from notifications.store import add_notifications_bulk
         from auth import load_config
         
         print(f"📊 [{datetime.now()}] Generando reportes mensuales...")
         
         config = load_config()
-        email_service = EmailService()
+        metricas = ejecucion_actual()
         
         mes = datetime.now().strftime("%B")
         año = datetime.now().year
@@ -124,128 +277,90 @@ class NotificationScheduler:
         supervisores = {u: d for u, d in config['credentials']['usernames'].items() 
                        if d['role'] == 'supervisor'}
         
+        # Estadísticas de todas las áreas en una pasada; el HTML se arma una vez
+        reporte = preparar_reporte_mensual(mes, año)
+        
+        notificaciones = []
+        envios = []
         for username, user_data in supervisores.items():
             area = user_data.get('area')
-            
-            # Aquí deberías calcular estadísticas reales
-            estadisticas = {
-                'total_trabajadores': 0,  # Implementar lógica real
-                'horas_asignadas': 0,
-                'horas_confirmadas': 0,
-                'tasa_confirmacion': 0,
-                'estado': 'Normal'
-            }
+            metricas.sumar(procesados=1)
             
             # Notificación in-app
-            add_notification(
-                username,
-                'info',
-                f'📊 Reporte Mensual - {mes}',
-                f'Reporte mensual del área de {area} disponible',
-                icon='📈',
-                priority='normal'
-            )
+            notificaciones.append({
+                'username': username,
+                'type': 'info',
+                'title': f'📊 Reporte Mensual - {mes}',
+                'message': f'Reporte mensual del área de {area} disponible',
+                'icon': '📈',
+                'priority': 'normal'
+            })
             
             # Email
-            html = EmailTemplates.reporte_mensual(
-                user_data['name'],
-                area,
-                estadisticas,
-                mes,
-                año
-            )
-            
-            email_service.send_email(
-                user_data['email'],
-                f"Reporte Mensual - {mes} {año}",
-                html
-            )
+            html = reporte.html(area, user_data['name'])
+            envios.append((user_data['email'], f"Reporte Mensual - {mes} {año}", html))
+        
+        add_notifications_bulk(notificaciones)
+        resultado = entregar_emails(envios, email_service)
         
-        print("✅ Reportes mensuales enviados")
+        print(f"✅ Reportes mensuales enviados: {resultado['enviados']} ({resultado['fallidos']} fallidos)")
     
     def verificar_sobrecargas(self):
         """Verificar trabajadores con sobrecarga de horas"""
-        from database.notifications import add_notification
-        from notifications.whatsapp_service import WhatsAppService, WhatsAppTemplates
-        from auth import load_config
+        from notifications.sobrecargas import evaluar_sobrecargas
         
         print(f"🚨 [{datetime.now()}] Verificando sobrecargas...")
         
-        config = load_config()
-        whatsapp = WhatsAppService()
+        # Barrido completo en una pasada; solo alerta a quien recién pasó el
+        # límite (el estado se comparte con el verificador incremental)
+        trabajadores_sobrecargados = evaluar_sobrecargas()
         
-        LIMITE_HORAS = 40  # Límite semanal
+        # El verificador relee las horas: recoge cambios que no pasaron por el bus
+        get_verificador_sobrecargas().invalidar()
         
-        # Aquí deberías obtener trabajadores y sus horas reales
-        # Por ahora es un placeholder
-        
-        trabajadores_sobrecargados = []  # Implementar lógica real
-        
-        for trabajador in trabajadores_sobrecargados:
-            username = trabajador['username']
-            horas_totales = trabajador['horas_totales']
-            
-            # Notificación al trabajador
-            add_notification(
-                username,
-                'warning',
-                '🚨 Alerta de Sobrecarga',
-                f'Tienes {horas_totales}h asignadas (límite: {LIMITE_HORAS}h)',
-                icon='⚠️',
-                priority='high'
-            )
-            
-            # WhatsApp si está habilitado
-            if trabajador.get('whatsapp_habilitado') and trabajador.get('telefono'):
-                template = WhatsAppTemplates.alerta_sobrecarga(
-                    trabajador['nombre'],
-                    horas_totales,
-                    LIMITE_HORAS
-                )
-                whatsapp.send_template_message(trabajador['telefono'], template)
-            
-            # Notificar al supervisor
-            supervisor_username = trabajador.get('supervisor_username')
-            if supervisor_username:
-                add_notification(
-                    supervisor_username,
-                    'warning',
-                    '⚠️ Trabajador Sobrecargado',
-                    f"{trabajador['nombre']} tiene {horas_totales}h asignadas",
-                    icon='🚨',
-                    priority='high'
-                )
-        
-        print(f"✅ Verificación completada. {len(trabajadores_sobrecargados)} sobrecargas detectadas")
+        print(f"✅ Verificación completada. {len(trabajadores_sobrecargados)} sobrecargas nuevas detectadas")
     
     def limpiar_notificaciones_antiguas(self):
         """Limpiar notificaciones leídas antiguas"""
-        import sqlite3
+        from notifications.recordatorios import limpiar_progreso
+        from notifications.store import delete_old_notifications
         
         print(f"🧹 [{datetime.now()}] Limpiando notificaciones antiguas...")
         
         try:
             # Eliminar notificaciones leídas de más de 30 días
-            fecha_limite = (datetime.now() - timedelta(days=30)).isoformat()
+            eliminadas = delete_old_notifications(30, solo_leidas=True)
+            ejecucion_actual().sumar(procesados=eliminadas)
             
-            conn = sqlite3.connect('database/notifications.db')
-            c = conn.cursor()
-            
-            c.execute("""
-                DELETE FROM notifications 
-                WHERE read = 1 AND timestamp < ?
-            """, (fecha_limite,))
-            
-            eliminadas = c.rowcount
-            
-            conn.commit()
-            conn.close()
+            # Checkpoints de envíos de hace más de 8 semanas
+            limpiar_progreso()
             
             print(f"✅ {eliminadas} notificaciones antiguas eliminadas")
             
         except Exception as e:
+            ejecucion_actual().sumar(errores=1)
             print(f"❌ Error limpiando notificaciones: {e}")
     
+    def archivar_auditoria(self):
+        """Mover los meses antiguos de auditoría a particiones comprimibles"""
+        from database.audit_archive import archivar_meses
+        from database.audit_core import actor, log_action
+        
+        print(f"📦 [{datetime.now()}] Archivando auditoría...")
+        
+        try:
+            movidas = archivar_meses(meses_activos=3, comprimir_despues=6)
+            ejecucion_actual().sumar(procesados=sum(movidas.values()))
+            print(f"✅ {sum(movidas.values())} registros de auditoría archivados")
+            
+            if movidas:
+                with actor('scheduler', 'system'):
+                    log_action('ARCHIVE', 'audit_log', new_value=movidas,
+                               details=f"{sum(movidas.values())} registros archivados")
+        except Exception as e:
+            ejecucion_actual().sumar(errores=1)
+            print(f"❌ Error archivando auditoría: {e}")
+    
     def get_jobs_status(self):
         """Obtener estado de los jobs programados"""
         jobs_info = []
@@ -0,0 +1,437 @@
+"""
+Detección de sobrecargas de horas
+
+Calcula en una sola pasada (pandas, sin bucles por trabajador) el total de
+horas del año de cada trabajador activo y lo compara con su límite: el
+campo `limite_horas` del trabajador si lo tiene, o LIMITE_HORAS. Los
+supervisores se resuelven con un índice área → usernames armado una vez
+desde config.yaml.
+
+Para no repetir alertas se guarda el estado de cada trabajador en
+sobrecarga_estado (notifications.db) con histéresis: se alerta al pasar
+el límite y el aviso se rearma recién al bajar a `límite - HISTERESIS`.
+El barrido del scheduler y el VerificadorSobrecargas (que reacciona a
+los eventos de asignar_horas) comparten ese estado.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from notifications import store
+from notifications.event_bus import TOPIC_HORAS, get_event_bus
+from notifications.job_metrics import ejecucion_actual
+
+LIMITE_HORAS = float(os.getenv('LIMITE_HORAS', '40'))
+# Horas por debajo del límite para volver a alertar
+HISTERESIS = float(os.getenv('SOBRECARGA_HISTERESIS', '5'))
+# Espera para juntar varios guardados seguidos antes de evaluar
+DEBOUNCE_SEGUNDOS = 0.5
+
+COLUMNAS_SOBRECARGA = ['trabajador_id', 'nombre', 'telefono', 'whatsapp_habilitado', 'area', 'horas_totales', 'limite']
+# Campos del trabajador que usa la detección (la foto en base64 no se copia)
+COLUMNAS_TRABAJADOR = ['id', 'nombre', 'telefono', 'whatsapp_habilitado', 'area', 'estatus', 'limite_horas']
+
+def indice_usuarios(usuarios):
+    """
+    Índices de config.yaml para resolver destinatarios
+    
+    Args:
+        usuarios: dict username → datos (config['credentials']['usernames'])
+    
+    Returns:
+        (trabajador_id → username, área → [usernames de supervisores])
+    """
+    por_trabajador = {}
+    supervisores = {}
+    for username, datos in usuarios.items():
+        if datos.get('trabajador_id') is not None:
+            por_trabajador[int(datos['trabajador_id'])] = username
+        if datos.get('role') == 'supervisor' and datos.get('area'):
+            supervisores.setdefault(datos['area'], []).append(username)
+    return por_trabajador, supervisores
+
+def calcular_totales(horas, trabajadores, año=None, limite=LIMITE_HORAS):
+    """
+    Total de horas y límite de cada trabajador activo
+    
+    Args:
+        horas: lista de registros de horas_asignadas
+        trabajadores: lista de registros de trabajadores
+        año: año a evaluar (por defecto el actual)
+        limite: límite para quien no tiene `limite_horas`
+    
+    Returns:
+        DataFrame con COLUMNAS_SOBRECARGA (todos los activos, también los de 0h)
+    """
+    import pandas as pd
+    
+    if año is None:
+        año = datetime.now().year
+    
+    # Solo las columnas necesarias: la foto en base64 no se copia
+    horas_df = pd.DataFrame.from_records(horas, columns=['trabajador_id', 'horas', 'año'])
+    horas_df = horas_df[horas_df['año'] == año]
+    totales = horas_df.groupby('trabajador_id')['horas'].sum()
+    
+    trab_df = pd.DataFrame.from_records(trabajadores, columns=COLUMNAS_TRABAJADOR)
+    trab_df = trab_df[trab_df['estatus'] == 'activo']
+    
+    return pd.DataFrame({
+        'trabajador_id': trab_df['id'].astype(int),
+        'nombre': trab_df['nombre'],
+        'telefono': trab_df['telefono'].fillna(''),
+        'whatsapp_habilitado': trab_df['whatsapp_habilitado'].fillna(False).astype(bool),
+        'area': trab_df['area'],
+        'horas_totales': trab_df['id'].map(totales).fillna(0.0).astype(float),
+        'limite': pd.to_numeric(trab_df['limite_horas'], errors='coerce').fillna(limite).astype(float),
+    }, columns=COLUMNAS_SOBRECARGA).reset_index(drop=True)
+
+def detectar_sobrecargas(horas, trabajadores, año=None, limite=LIMITE_HORAS):
+    """Trabajadores activos cuyo total supera su límite (DataFrame)"""
+    totales = calcular_totales(horas, trabajadores, año, limite)
+    return totales[totales['horas_totales'] > totales['limite']].reset_index(drop=True)
+
+def notificaciones_sobrecarga(sobrecargados, por_trabajador, supervisores):
+    """
+    Notificaciones in-app para el trabajador y los supervisores de su área
+    
+    Returns:
+        Lista de dicts para store.add_notifications_bulk
+    """
+    notificaciones = []
+    for trabajador_id, nombre, area, horas_totales, limite in zip(
+        sobrecargados['trabajador_id'], sobrecargados['nombre'], sobrecargados['area'],
+        sobrecargados['horas_totales'], sobrecargados['limite']
+    ):
+        username = por_trabajador.get(int(trabajador_id))
+        if username:
+            notificaciones.append({
+                'username': username,
+                'type': 'sobrecarga',
+                'title': '🚨 Alerta de Sobrecarga',
+                'message': f'Tienes {horas_totales:g}h asignadas (límite: {limite:g}h)',
+                'icon': '⚠️',
+                'priority': 'high',
+            })
+        
+        for supervisor_username in supervisores.get(area, []):
+            notificaciones.append({
+                'username': supervisor_username,
+                'type': 'sobrecarga',
+                'title': '⚠️ Trabajador Sobrecargado',
+                'message': f"{nombre} tiene {horas_totales:g}h asignadas (límite: {limite:g}h)",
+                'icon': '🚨',
+                'priority': 'high',
+            })
+    return notificaciones
+
+# ==================== ESTADO (HISTÉRESIS) ====================
+
+ESTADO_SQL = '''
+    CREATE TABLE IF NOT EXISTS sobrecarga_estado (
+        trabajador_id INTEGER NOT NULL,
+        año INTEGER NOT NULL,
+        sobrecargado INTEGER NOT NULL DEFAULT 0,
+        horas_totales REAL,
+        limite REAL,
+        actualizado TEXT,
+        PRIMARY KEY (trabajador_id, año)
+    )
+'''
+
+def _conectar():
+    conn = sqlite3.connect(str(store.DB_PATH), timeout=30)
+    conn.execute(ESTADO_SQL)
+    return conn
+
+def aplicar_histeresis(totales, año, histeresis=HISTERESIS):
+    """
+    Actualizar sobrecarga_estado con los totales y devolver a quién alertar
+    
+    Lectura y escritura van en una transacción BEGIN IMMEDIATE: si el
+    barrido y el verificador evalúan a la vez al mismo trabajador, solo
+    uno ve la transición y alerta.
+    
+    Args:
+        totales: DataFrame de calcular_totales
+        año: año evaluado
+        histeresis: horas bajo el límite para rearmar la alerta
+    
+    Returns:
+        Filas de `totales` que acaban de pasar a sobrecargado
+    """
+    if totales.empty:
+        return totales
+    
+    ids = [int(i) for i in totales['trabajador_id']]
+    conn = _conectar()
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if len(ids) <= store.LOTE_IDS:
+                marcadores = ','.join('?' * len(ids))
+                filas = conn.execute(
+                    f"SELECT trabajador_id, sobrecargado FROM sobrecarga_estado WHERE año = ? AND trabajador_id IN ({marcadores})",
+                    [año] + ids
+                ).fetchall()
+            else:
+                filas = conn.execute(
+                    "SELECT trabajador_id, sobrecargado FROM sobrecarga_estado WHERE año = ?", (año,)
+                ).fetchall()
+            previo = totales['trabajador_id'].map(dict(filas)).fillna(0).astype(bool)
+            
+            encima = totales['horas_totales'] > totales['limite']
+            debajo = totales['horas_totales'] <= totales['limite'] - histeresis
+            estado = encima | (previo & ~debajo)
+            
+            # Solo se escriben las transiciones (horas y límite del momento del cambio)
+            cambiados = totales[estado != previo]
+            ahora = datetime.now().isoformat()
+            conn.executemany('''
+                INSERT INTO sobrecarga_estado (trabajador_id, año, sobrecargado, horas_totales, limite, actualizado)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(trabajador_id, año) DO UPDATE SET
+                    sobrecargado = excluded.sobrecargado,
+                    horas_totales = excluded.horas_totales,
+                    limite = excluded.limite,
+                    actualizado = excluded.actualizado
+            ''', [
+                (int(trabajador_id), año, int(sobre), float(horas_totales), float(limite), ahora)
+                for trabajador_id, sobre, horas_totales, limite in zip(
+                    cambiados['trabajador_id'], estado[estado != previo],
+                    cambiados['horas_totales'], cambiados['limite']
+                )
+            ])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    
+    return totales[estado & ~previo].reset_index(drop=True)
+
+# ==================== EVALUACIÓN ====================
+
+def enviar_whatsapp(sobrecargados):
+    """Alerta por WhatsApp a los trabajadores que la tienen habilitada"""
+    con_whatsapp = sobrecargados[sobrecargados['whatsapp_habilitado'] & (sobrecargados['telefono'] != '')]
+    if con_whatsapp.empty:
+        return 0
+    
+    from notifications.whatsapp_service import WhatsAppService
+    whatsapp = WhatsAppService()
+    enviados = 0
+    for trabajador in con_whatsapp.itertuples():
+        if whatsapp.send_template_message(trabajador.telefono, {
+            'type': 'alerta_sobrecarga',
+            'nombre': trabajador.nombre,
+            'horas_totales': trabajador.horas_totales,
+            'limite': trabajador.limite
+        }):
+            enviados += 1
+    
+    ejecucion_actual().sumar(whatsapps=enviados, errores=len(con_whatsapp) - enviados)
+    return enviados
+
+def evaluar_sobrecargas(trabajador_ids=None, año=None, usuarios=None, limite=LIMITE_HORAS,
+                        horas=None, trabajadores=None):
+    """
+    Evaluar sobrecargas y alertar solo en las transiciones
+    
+    Args:
+        trabajador_ids: solo estos trabajadores (None = todos)
+        año: año a evaluar (por defecto el actual)
+        usuarios: config['credentials']['usernames'] (por defecto se lee config.yaml)
+        limite: límite para quien no tiene `limite_horas`
+        horas, trabajadores: registros ya cargados (por defecto se leen los JSON)
+    
+    Returns:
+        DataFrame de los trabajadores alertados
+    """
+    if año is None:
+        año = datetime.now().year
+    if usuarios is None:
+        from auth import load_config
+        usuarios = load_config()['credentials']['usernames']
+    
+    if horas is None:
+        from database.workers_json import leer_horas
+        horas = leer_horas()['horas_asignadas']
+    if trabajadores is None:
+        from database.workers_json import leer_trabajadores
+        trabajadores = leer_trabajadores()['trabajadores']
+    if trabajador_ids is not None:
+        ids = {int(i) for i in trabajador_ids}
+        horas = [h for h in horas if h['trabajador_id'] in ids]
+        trabajadores = [t for t in trabajadores if t['id'] in ids]
+    
+    totales = calcular_totales(horas, trabajadores, año, limite)
+    alertados = aplicar_histeresis(totales, año)
+    ejecucion_actual().sumar(procesados=len(totales))
+    
+    por_trabajador, supervisores = indice_usuarios(usuarios)
+    store.add_notifications_bulk(notificaciones_sobrecarga(alertados, por_trabajador, supervisores))
+    enviar_whatsapp(alertados)
+    return alertados
+
+class IndiceHoras:
+    """
+    Horas de cada (trabajador, año) por rubro, en memoria
+    
+    Se carga una vez del archivo de horas y después se mantiene con los
+    eventos de asignar_horas, así evaluar a unos trabajadores no vuelve a
+    leer ni recorrer el archivo entero. invalidar() fuerza la recarga (p. ej.
+    tras el barrido diario, que también ve los cambios de otros procesos).
+    """
+    
+    def __init__(self):
+        self._horas = None
+    
+    def invalidar(self):
+        self._horas = None
+    
+    def _cargar(self):
+        from database.workers_json import leer_horas
+        
+        horas = {}
+        for h in leer_horas()['horas_asignadas']:
+            horas.setdefault((int(h['trabajador_id']), int(h['año'])), {})[int(h['rubro_id'])] = float(h['horas'])
+        self._horas = horas
+    
+    def aplicar(self, trabajador_id, año, rubro_id, horas):
+        """Registrar el valor nuevo de un rubro (si aún no se cargó, la carga ya lo trae)"""
+        if self._horas is not None:
+            self._horas.setdefault((trabajador_id, año), {})[rubro_id] = horas
+    
+    def registros(self, trabajador_ids, año):
+        """Registros de horas (trabajador_id, horas, año) de esos trabajadores"""
+        if self._horas is None:
+            self._cargar()
+        return [
+            {'trabajador_id': trabajador_id, 'horas': horas, 'año': año}
+            for trabajador_id in trabajador_ids
+            for horas in self._horas.get((trabajador_id, año), {}).values()
+        ]
+
+class IndiceTrabajadores:
+    """Trabajadores por id (sin la foto); se recarga solo si cambia el archivo"""
+    
+    def __init__(self):
+        self._por_id = {}
+        self._firma = None
+    
+    def registros(self, trabajador_ids):
+        from database import workers_json
+        
+        ruta = workers_json.TRABAJADORES_FILE
+        firma = ruta.stat().st_mtime_ns if ruta.exists() else None
+        if firma != self._firma:
+            self._por_id = {
+                int(t['id']): {col: t.get(col) for col in COLUMNAS_TRABAJADOR}
+                for t in workers_json.leer_trabajadores()['trabajadores']
+            }
+            self._firma = firma
+        return [self._por_id[i] for i in trabajador_ids if i in self._por_id]
+
+class VerificadorSobrecargas:
+    """
+    Re-evalúa la sobrecarga de los trabajadores cuyas horas cambiaron
+    
+    Escucha TOPIC_HORAS en el bus; el callback solo encola y un hilo
+    de fondo agrupa los eventos de DEBOUNCE_SEGUNDOS y evalúa a esos
+    trabajadores, sin recorrer a los demás: las horas salen de un
+    IndiceHoras que se actualiza con cada evento.
+    """
+    
+    def __init__(self, debounce=DEBOUNCE_SEGUNDOS, bus=None):
+        self.debounce = debounce
+        self._bus = bus or get_event_bus()
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._subscription_id = None
+        self._horas = IndiceHoras()
+        self._trabajadores = IndiceTrabajadores()
+        
+        # Contadores
+        self.eventos = 0
+        self.alertas = 0
+    
+    def start(self):
+        """Suscribirse al bus e iniciar el hilo"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._subscription_id = self._bus.subscribe(TOPIC_HORAS, self._recibir)
+        self._hilo = threading.Thread(target=self._run, name='verificador-sobrecargas', daemon=True)
+        self._hilo.start()
+    
+    def stop(self, timeout=5):
+        """Cancelar la suscripción y procesar lo pendiente"""
+        if self._subscription_id is not None:
+            self._bus.unsubscribe(TOPIC_HORAS, self._subscription_id)
+            self._subscription_id = None
+        if self._hilo is not None:
+            self._cola.put(None)
+            self._hilo.join(timeout)
+            self._hilo = None
+    
+    def invalidar(self):
+        """Recargar las horas del archivo en la próxima evaluación"""
+        self._horas.invalidar()
+    
+    def _recibir(self, topic, trabajador_id, año, rubro_id=None, horas=None, **payload):
+        self.eventos += 1
+        self._cola.put((trabajador_id, año, rubro_id, horas))
+    
+    def _anotar(self, evento, pendientes):
+        trabajador_id, año, rubro_id, horas = evento
+        if rubro_id is None or horas is None:
+            # Cambio sin detalle: releer el archivo
+            self._horas.invalidar()
+        else:
+            self._horas.aplicar(trabajador_id, año, rubro_id, horas)
+        pendientes.setdefault(año, set()).add(trabajador_id)
+    
+    def _run(self):
+        while True:
+            evento = self._cola.get()
+            pendientes = {}
+            fin = evento is None
+            if not fin:
+                self._anotar(evento, pendientes)
+                # Juntar lo que llegue durante la ventana (guardado de varios rubros)
+                time.sleep(self.debounce)
+            while True:
+                try:
+                    evento = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if evento is None:
+                    fin = True
+                else:
+                    self._anotar(evento, pendientes)
+            
+            for año, ids in pendientes.items():
+                try:
+                    self.alertas += len(evaluar_sobrecargas(
+                        ids, año,
+                        horas=self._horas.registros(ids, año),
+                        trabajadores=self._trabajadores.registros(ids)
+                    ))
+                except Exception as e:
+                    print(f"❌ Error verificando sobrecargas: {e}")
+            if fin:
+                return
+
+# Singleton global
+_verificador_instance = None
+
+def get_verificador_sobrecargas():
+    """Obtener el verificador incremental (singleton)"""
+    global _verificador_instance
+    if _verificador_instance is None:
+        _verificador_instance = VerificadorSobrecargas()
+    return _verificador_instance
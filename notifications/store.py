@@ -0,0 +1,657 @@
+"""
+Almacén único de notificaciones in-app
+
+Antes había dos bases con esquemas distintos: notifications.db en la raíz
+(notifications.inapp, usada por el sidebar) y database/notifications.db
+(database.notifications, usada por el scheduler, con ruta relativa al
+directorio de trabajo). Ahora ambos módulos delegan aquí y todo vive en
+notifications.db de la raíz, con ruta absoluta.
+
+init_notifications_db() migra el esquema antiguo e incorpora una sola vez
+las filas de database/notifications.db.
+
+Las no leídas por usuario se mantienen en la tabla notification_unread
+(triggers sobre notifications), junto con una versión que aumenta con
+cualquier cambio en las notificaciones de ese usuario. get_unread_count
+lee solo la fila del usuario (búsqueda por clave primaria), así el badge
+del sidebar no hace un COUNT en cada rerun, ve los cambios de otras
+sesiones o procesos y no se entera de las escrituras en otras tablas de
+la base (job_runs, envios_progreso, ...).
+
+Cada escritura publica además un evento por usuario afectado en
+notifications.event_bus, para que las sesiones abiertas sepan que deben
+refrescar su panel sin volver a consultar en cada rerun.
+
+add_notification y add_notifications_bulk agrupan las notificaciones de
+los tipos de NOTIF_COALESCE_TYPES (por defecto 'cambio_horas' y
+'sobrecarga') para el mismo usuario que llegan dentro de
+NOTIF_COALESCE_SECONDS en una sola fila (resumen) cuya columna `count`
+indica cuántas representa; los mensajes se guardan separados por '\n'.
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from notifications.event_bus import publicar_cambio
+
+# Ventana (segundos) para agrupar notificaciones no leídas del mismo tipo; 0 = nunca
+COALESCE_WINDOW = int(os.getenv('NOTIF_COALESCE_SECONDS', '300'))
+# Tipos que se agrupan por defecto (separados por comas); el resto solo si se pide coalesce_window
+COALESCE_TYPES = {t.strip() for t in os.getenv('NOTIF_COALESCE_TYPES', 'cambio_horas,sobrecarga').split(',') if t.strip()}
+# Líneas de mensaje que conserva una notificación agrupada
+COALESCE_MAX_LINEAS = 10
+# Ids por sentencia en las operaciones masivas (SQLite admite 999 parámetros en versiones antiguas)
+LOTE_IDS = 500
+
+DB_PATH = Path(__file__).parent.parent / 'notifications.db'
+LEGACY_DB_PATH = Path(__file__).parent.parent / 'database' / 'notifications.db'
+
+COLUMNAS = ['user_id', 'username', 'timestamp', 'type', 'title', 'message', 'read', 'link', 'icon', 'priority', 'count']
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        username TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        type TEXT NOT NULL,
+        title TEXT NOT NULL,
+        message TEXT NOT NULL,
+        read INTEGER DEFAULT 0,
+        link TEXT,
+        icon TEXT DEFAULT '📢',
+        priority TEXT DEFAULT 'normal',
+        count INTEGER NOT NULL DEFAULT 1
+    )
+'''
+
+INSERT_SQL = '''
+    INSERT INTO notifications
+    (user_id, username, timestamp, type, title, message, link, icon, priority)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+FUSIONES_SQL = '''
+    CREATE TABLE IF NOT EXISTS notification_fusiones (
+        archivo TEXT PRIMARY KEY,
+        fecha TEXT NOT NULL
+    )
+'''
+
+CONTADORES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS notification_unread (
+        username TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS notif_usuario_ai AFTER INSERT ON notifications
+    BEGIN
+        INSERT INTO notification_unread (username, count, version) VALUES (new.username, new.read = 0, 1)
+        ON CONFLICT (username) DO UPDATE SET count = count + (new.read = 0), version = version + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS notif_usuario_ad AFTER DELETE ON notifications
+    BEGIN
+        UPDATE notification_unread SET count = count - (old.read = 0), version = version + 1
+        WHERE username = old.username;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS notif_usuario_au AFTER UPDATE ON notifications
+    BEGIN
+        UPDATE notification_unread SET count = count - (old.read = 0), version = version + 1
+        WHERE username = old.username;
+        INSERT INTO notification_unread (username, count, version) VALUES (new.username, new.read = 0, 1)
+        ON CONFLICT (username) DO UPDATE SET count = count + (new.read = 0), version = version + 1;
+    END
+    ''',
+]
+
+# Triggers anteriores, que solo seguían las no leídas
+TRIGGERS_ANTERIORES = ['notif_unread_ai', 'notif_unread_ad', 'notif_unread_au']
+
+def _conectar():
+    return sqlite3.connect(str(DB_PATH), timeout=30)
+
+def _select_compatible(conn, esquema, tabla):
+    """SELECT de las columnas de COLUMNAS desde una tabla con esquema antiguo"""
+    existentes = {fila[1] for fila in conn.execute(f"PRAGMA {esquema}.table_info({tabla})")}
+    valores = {
+        'user_id': "NULLIF(user_id, 0)",
+        'username': "COALESCE(username, '')",
+        'read': "COALESCE(read, 0)",
+        'icon': "COALESCE(icon, '📢')",
+        'priority': "COALESCE(priority, 'normal')",
+        'count': "COALESCE(count, 1)",
+    }
+    ausentes = {'priority': "'normal'", 'count': '1'}
+    return ', '.join(
+        (valores.get(col, col) if col in existentes else ausentes.get(col, 'NULL'))
+        for col in COLUMNAS
+    )
+
+def _esquema_antiguo(conn):
+    """True si la tabla tiene el esquema de notifications.inapp (user_id NOT NULL, sin priority)"""
+    info = {fila[1]: fila for fila in conn.execute("PRAGMA main.table_info(notifications)")}
+    if not info:
+        return False
+    return 'priority' not in info or bool(info['user_id'][3]) or not info['username'][3]
+
+def _migrar_esquema(conn):
+    """Reconstruir la tabla con el esquema unificado conservando ids y filas"""
+    if not _esquema_antiguo(conn):
+        return False
+    
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not _esquema_antiguo(conn):
+            conn.execute("ROLLBACK")
+            return False
+        
+        conn.execute("ALTER TABLE notifications RENAME TO notifications_anterior")
+        conn.execute(CREATE_TABLE_SQL)
+        conn.execute(f'''
+            INSERT INTO notifications (id, {', '.join(COLUMNAS)})
+            SELECT id, {_select_compatible(conn, 'main', 'notifications_anterior')}
+            FROM notifications_anterior
+        ''')
+        conn.execute("DROP TABLE notifications_anterior")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    print("🔧 Esquema de notificaciones migrado")
+    return True
+
+def _fusionar_legacy(conn):
+    """Copiar una vez las filas de database/notifications.db y retirar ese archivo"""
+    if not LEGACY_DB_PATH.exists() or LEGACY_DB_PATH.resolve() == DB_PATH.resolve():
+        return False
+    
+    # Archivos ya copiados: si el renombrado falla, el próximo inicio no vuelve a copiar
+    conn.execute(FUSIONES_SQL)
+    archivo = str(LEGACY_DB_PATH.resolve())
+    copiadas = None
+    
+    conn.execute("ATTACH DATABASE ? AS legacy", (str(LEGACY_DB_PATH),))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo fusionarla mientras se esperaba el bloqueo
+            fusionada = conn.execute(
+                "SELECT 1 FROM main.notification_fusiones WHERE archivo = ?", (archivo,)
+            ).fetchone()
+            if not fusionada:
+                tiene_tabla = conn.execute(
+                    "SELECT 1 FROM legacy.sqlite_master WHERE type = 'table' AND name = 'notifications'"
+                ).fetchone()
+                copiadas = 0
+                if tiene_tabla:
+                    c = conn.execute(f'''
+                        INSERT INTO main.notifications ({', '.join(COLUMNAS)})
+                        SELECT {_select_compatible(conn, 'legacy', 'notifications')}
+                        FROM legacy.notifications
+                    ''')
+                    copiadas = c.rowcount
+                conn.execute(
+                    "INSERT INTO main.notification_fusiones (archivo, fecha) VALUES (?, ?)",
+                    (archivo, datetime.now().isoformat())
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("DETACH DATABASE legacy")
+    
+    # Renombrar solo con la copia confirmada y el archivo ya cerrado (Windows
+    # no renombra un archivo abierto)
+    try:
+        LEGACY_DB_PATH.rename(LEGACY_DB_PATH.with_name(LEGACY_DB_PATH.name + '.migrado'))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ No se pudo renombrar {LEGACY_DB_PATH}: {e}")
+    
+    if copiadas is None:
+        return False
+    print(f"🔧 {copiadas} notificaciones fusionadas desde {LEGACY_DB_PATH}")
+    return True
+
+def reconstruir_contadores(conn=None):
+    """
+    Recalcular las no leídas de notification_unread desde notifications
+    
+    Las versiones no vuelven atrás: se incrementan para que quien guardó
+    datos con la versión anterior los vuelva a leer.
+    """
+    propia = conn is None
+    if propia:
+        conn = _conectar()
+        conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE notification_unread SET count = 0, version = version + 1")
+            conn.execute('''
+                INSERT INTO notification_unread (username, count, version)
+                SELECT username, COUNT(*), 1 FROM notifications WHERE read = 0 GROUP BY username
+                ON CONFLICT (username) DO UPDATE SET count = excluded.count
+            ''')
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        if propia:
+            conn.close()
+
+def init_notifications_db():
+    """Crear (o migrar y fusionar) la tabla de notificaciones"""
+    conn = _conectar()
+    conn.isolation_level = None
+    try:
+        cambios = _migrar_esquema(conn)
+        conn.execute(CREATE_TABLE_SQL)
+        columnas = {fila[1] for fila in conn.execute("PRAGMA main.table_info(notifications)")}
+        if 'count' not in columnas:
+            conn.execute("ALTER TABLE notifications ADD COLUMN count INTEGER NOT NULL DEFAULT 1")
+        cambios = _fusionar_legacy(conn) or cambios
+        
+        # No leídas y lista reciente por usuario: recorridos de índice sin ordenar
+        conn.execute('DROP INDEX IF EXISTS idx_user')
+        conn.execute('DROP INDEX IF EXISTS idx_read')
+        conn.execute('DROP INDEX IF EXISTS idx_timestamp')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_notif_user_read_ts ON notifications(username, read, timestamp DESC)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_notif_user_ts ON notifications(username, timestamp DESC)')
+        
+        # Contadores de no leídas y versión por usuario mantenidos por triggers
+        nuevos = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notification_unread'"
+        ).fetchone()
+        conn.execute(CONTADORES_SQL[0])
+        columnas = {fila[1] for fila in conn.execute("PRAGMA main.table_info(notification_unread)")}
+        if 'version' not in columnas:
+            conn.execute("ALTER TABLE notification_unread ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        for trigger in TRIGGERS_ANTERIORES:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        for sql in CONTADORES_SQL[1:]:
+            conn.execute(sql)
+        if nuevos or cambios:
+            reconstruir_contadores(conn)
+    finally:
+        conn.close()
+
+def _mensaje_agrupado(anterior, nuevo):
+    """Mensaje de una notificación agrupada: las últimas COALESCE_MAX_LINEAS líneas"""
+    lineas = anterior.split('\n') + [nuevo]
+    return '\n'.join(lineas[-COALESCE_MAX_LINEAS:])
+
+def _ventana_tipo(type):
+    """Ventana de agrupación por defecto del tipo (0 = no se agrupa)"""
+    return COALESCE_WINDOW if type in COALESCE_TYPES else 0
+
+def _agrupar(conn, username, type, title, message, link, icon, priority, ventana, ahora):
+    """
+    Sumar la notificación a la no leída del mismo tipo de hace menos de
+    `ventana` segundos, dentro de la transacción de `conn`
+    
+    Returns:
+        id de la fila agrupada, o None si hay que insertar una nueva
+    """
+    if ventana <= 0:
+        return None
+    
+    existente = conn.execute('''
+        SELECT id, message FROM notifications
+        WHERE username = ? AND read = 0 AND timestamp >= ? AND type = ?
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ''', (username, (ahora - timedelta(seconds=ventana)).isoformat(), type)).fetchone()
+    if not existente:
+        return None
+    
+    conn.execute('''
+        UPDATE notifications
+        SET count = count + 1, timestamp = ?, title = ?, message = ?,
+            link = COALESCE(?, link), icon = ?,
+            priority = CASE WHEN ? = 'high' THEN 'high' ELSE priority END
+        WHERE id = ?
+    ''', (ahora.isoformat(), title, _mensaje_agrupado(existente[1], message),
+          link, icon, priority, existente[0]))
+    return existente[0]
+
+def add_notification(username, type, title, message, link=None, icon="📢", priority="normal", user_id=None,
+                     coalesce_window=None):
+    """
+    Agregar una notificación; devuelve su id
+    
+    Si el usuario tiene una notificación no leída del mismo tipo de hace
+    menos de `coalesce_window` segundos, se agrega a esa fila en lugar de
+    crear otra: aumenta `count`, se suma el mensaje y se actualiza la fecha.
+    Por defecto la ventana es COALESCE_WINDOW para los tipos de
+    COALESCE_TYPES y 0 (no se agrupa) para los demás.
+    """
+    ventana = coalesce_window
+    if ventana is None:
+        ventana = _ventana_tipo(type)
+    ahora = datetime.now()
+    
+    conn = _conectar()
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existente = _agrupar(conn, username, type, title, message, link, icon, priority, ventana, ahora)
+            if existente:
+                notification_id = existente
+            else:
+                c = conn.execute(
+                    INSERT_SQL,
+                    (user_id, username, ahora.isoformat(), type, title, message, link, icon, priority)
+                )
+                notification_id = c.lastrowid
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    
+    publicar_cambio(username, 'nueva', notification_id=notification_id, agrupada=bool(existente))
+    return notification_id
+
+def add_notifications_bulk(notificaciones, filtro=None):
+    """
+    Insertar muchas notificaciones en una sola transacción
+    
+    Las de tipos de COALESCE_TYPES se agrupan igual que en add_notification.
+    
+    Args:
+        notificaciones: iterable de dicts con username, type, title, message
+            y opcionalmente link, icon, priority, user_id
+        filtro: callable(conn, notificaciones) que corre dentro de la misma
+            transacción y devuelve las que se insertan (p. ej. para guardar
+            un checkpoint junto con la notificación)
+    
+    Returns:
+        Cantidad de notificaciones registradas (nuevas o agrupadas)
+    """
+    notificaciones = list(notificaciones)
+    if not notificaciones:
+        return 0
+    
+    ahora = datetime.now()
+    conn = _conectar()
+    try:
+        with conn:
+            if filtro is not None:
+                notificaciones = filtro(conn, notificaciones)
+            filas = []
+            for n in notificaciones:
+                fila = (
+                    n.get('user_id'), n['username'], ahora.isoformat(), n['type'], n['title'], n['message'],
+                    n.get('link'), n.get('icon', '📢'), n.get('priority', 'normal')
+                )
+                ventana = _ventana_tipo(n['type'])
+                if ventana <= 0:
+                    filas.append(fila)
+                elif not _agrupar(conn, n['username'], n['type'], n['title'], n['message'], *fila[6:], ventana, ahora):
+                    # Se inserta ya, para que la siguiente del mismo usuario y tipo se agrupe con ella
+                    conn.execute(INSERT_SQL, fila)
+            conn.executemany(INSERT_SQL, filas)
+    finally:
+        conn.close()
+    
+    for username in {n['username'] for n in notificaciones}:
+        publicar_cambio(username, 'nueva')
+    return len(notificaciones)
+
+def resolver_destinatarios(usuarios, roles=None, areas=None, exclude_roles=None):
+    """
+    Usernames que cumplen los filtros
+    
+    Args:
+        usuarios: dict username → datos (config['credentials']['usernames'])
+        roles: solo estos roles (None = todos)
+        areas: solo usuarios de estas áreas; para trabajadores sin área en
+            config se usa el área de su trabajador_id
+        exclude_roles: roles a excluir
+    
+    Returns:
+        Lista de usernames
+    """
+    area_trabajador = None
+    destinatarios = []
+    
+    for username, datos in usuarios.items():
+        rol = datos.get('role')
+        if roles and rol not in roles:
+            continue
+        if exclude_roles and rol in exclude_roles:
+            continue
+        
+        if areas:
+            area = datos.get('area')
+            if not area and datos.get('trabajador_id') is not None:
+                if area_trabajador is None:
+                    from database.workers_json import leer_trabajadores
+                    area_trabajador = {t['id']: t.get('area') for t in leer_trabajadores()['trabajadores']}
+                area = area_trabajador.get(datos['trabajador_id'])
+            if area not in areas:
+                continue
+        
+        destinatarios.append(username)
+    
+    return destinatarios
+
+def add_notification_to_all(usuarios, type, title, message, link=None, icon="📢", priority="normal",
+                            roles=None, areas=None, exclude_roles=None):
+    """
+    Enviar la misma notificación a todos los usuarios que cumplen los filtros
+    
+    Los destinatarios se resuelven una vez y se insertan juntos con
+    add_notifications_bulk. Devuelve la cantidad de notificaciones creadas.
+    """
+    destinatarios = resolver_destinatarios(usuarios, roles, areas, exclude_roles)
+    return add_notifications_bulk(
+        {'username': username, 'type': type, 'title': title, 'message': message,
+         'link': link, 'icon': icon, 'priority': priority}
+        for username in destinatarios
+    )
+
+def get_user_notifications(username, unread_only=False, limit=50):
+    """Notificaciones del usuario, de la más reciente a la más antigua (DataFrame)"""
+    import pandas as pd
+    
+    query = "SELECT * FROM notifications WHERE username = ?"
+    params = [username]
+    
+    if unread_only:
+        query += " AND read = 0"
+    
+    query += " ORDER BY timestamp DESC"
+    
+    if limit:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    
+    conn = _conectar()
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+def get_notifications_page(username, after_ts=None, after_id=None, page_size=20, unread_only=False):
+    """
+    Página de notificaciones del usuario con paginación por cursor (keyset)
+    
+    Recorre idx_notif_user_ts (o idx_notif_user_read_ts si unread_only) desde
+    el cursor, sin OFFSET: cualquier página cuesta lo mismo que la primera.
+    
+    Args:
+        username: usuario
+        after_ts: timestamp de la última fila de la página anterior
+        after_id: id de la última fila de la página anterior
+        page_size: filas por página
+        unread_only: solo no leídas
+    
+    Returns:
+        (DataFrame, cursor siguiente (timestamp, id) o None si no hay más)
+    """
+    import pandas as pd
+    
+    query = "SELECT * FROM notifications WHERE username = ?"
+    params = [username]
+    
+    if unread_only:
+        query += " AND read = 0"
+    
+    if after_ts is not None and after_id is not None:
+        query += " AND (timestamp, id) < (?, ?)"
+        params.extend([after_ts, int(after_id)])
+    
+    # Se pide una fila de más para saber si existe página siguiente
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(int(page_size) + 1)
+    
+    conn = _conectar()
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    
+    siguiente = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        ultima = df.iloc[-1]
+        siguiente = (ultima['timestamp'], int(ultima['id']))
+    return df, siguiente
+
+def estado_usuario(username):
+    """
+    (no leídas, versión) del usuario desde su fila de notification_unread
+    
+    La versión aumenta con cualquier cambio en las notificaciones del
+    usuario, hecho por este u otro proceso; las escrituras en otras tablas
+    o de otros usuarios no la tocan.
+    """
+    conn = _conectar()
+    try:
+        fila = conn.execute(
+            "SELECT count, version FROM notification_unread WHERE username = ?", (username,)
+        ).fetchone()
+    finally:
+        conn.close()
+    
+    if not fila:
+        return 0, 0
+    return max(fila[0], 0), fila[1]
+
+def get_unread_count(username):
+    """Cantidad de notificaciones sin leer (fila del usuario en notification_unread)"""
+    return estado_usuario(username)[0]
+
+def _ejecutar(query, params, evento):
+    """
+    Ejecutar una escritura con RETURNING username y avisar a los usuarios afectados
+    
+    Returns:
+        Filas afectadas
+    """
+    conn = _conectar()
+    try:
+        with conn:
+            afectados = [fila[0] for fila in conn.execute(query, params).fetchall()]
+    finally:
+        conn.close()
+    
+    for username in set(afectados):
+        publicar_cambio(username, evento)
+    return len(afectados)
+
+def _ejecutar_por_ids(query, ids, evento):
+    """
+    Ejecutar `query` (con {marcadores}) sobre una lista de ids
+    
+    Los ids se procesan en lotes de LOTE_IDS parámetros, todos dentro de
+    la misma transacción; cada usuario afectado recibe un solo evento.
+    
+    Returns:
+        Filas afectadas
+    """
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        return 0
+    
+    afectados = []
+    conn = _conectar()
+    try:
+        with conn:
+            for inicio in range(0, len(ids), LOTE_IDS):
+                lote = ids[inicio:inicio + LOTE_IDS]
+                marcadores = ','.join('?' * len(lote))
+                afectados.extend(
+                    fila[0] for fila in conn.execute(query.format(marcadores=marcadores), lote).fetchall()
+                )
+    finally:
+        conn.close()
+    
+    for username in set(afectados):
+        publicar_cambio(username, evento)
+    return len(afectados)
+
+def mark_notification_read(notification_id):
+    """Marcar notificación como leída"""
+    return _ejecutar(
+        "UPDATE notifications SET read = 1 WHERE id = ? RETURNING username",
+        (int(notification_id),), 'leida'
+    )
+
+def mark_all_read(username):
+    """Marcar todas las notificaciones del usuario como leídas"""
+    return _ejecutar(
+        "UPDATE notifications SET read = 1 WHERE username = ? AND read = 0 RETURNING username",
+        (username,), 'leida'
+    )
+
+def mark_read_many(ids):
+    """Marcar varias notificaciones como leídas en una transacción"""
+    return _ejecutar_por_ids(
+        "UPDATE notifications SET read = 1 WHERE read = 0 AND id IN ({marcadores}) RETURNING username",
+        ids, 'leida'
+    )
+
+def delete_notification(notification_id):
+    """Eliminar una notificación"""
+    return _ejecutar(
+        "DELETE FROM notifications WHERE id = ? RETURNING username",
+        (int(notification_id),), 'eliminada'
+    )
+
+def delete_many(ids):
+    """Eliminar varias notificaciones en una transacción"""
+    return _ejecutar_por_ids(
+        "DELETE FROM notifications WHERE id IN ({marcadores}) RETURNING username",
+        ids, 'eliminada'
+    )
+
+def delete_all_notifications(username):
+    """Eliminar todas las notificaciones de un usuario"""
+    return _ejecutar(
+        "DELETE FROM notifications WHERE username = ? RETURNING username",
+        (username,), 'eliminada'
+    )
+
+def delete_old_notifications(days=30, solo_leidas=False):
+    """Eliminar notificaciones de más de `days` días; devuelve cuántas se borraron"""
+    fecha_limite = (datetime.now() - timedelta(days=days)).isoformat()
+    query = "DELETE FROM notifications WHERE timestamp < ?"
+    if solo_leidas:
+        query += " AND read = 1"
+    return _ejecutar(query + " RETURNING username", (fecha_limite,), 'eliminada')
@@ -1,8 +1,13 @@
 """Página de auditoría"""
 import streamlit as st
-from database.audit import get_audit_log
+from database.audit import get_audit_page
+from database.audit_export import exportar_auditoria, PARQUET_AVAILABLE
 from auth.roles import require_role
 from datetime import date, datetime
+import os
+import tempfile
+
+PAGE_SIZE = 100
 
 @require_role(['admin'])
 def show_audit_page():
@@ -24,12 +29,64 @@ def show_audit_page():
     if action != "Todas":
         filters['action'] = action
     
-    audit_df = get_audit_log(limit=500, filters=filters)
+    # Pila de cursores: uno por cada página visitada (None = primera página)
+    if st.session_state.get('audit_filters') != filters:
+        st.session_state['audit_filters'] = filters
+        st.session_state['audit_cursores'] = [None]
+    cursores = st.session_state['audit_cursores']
+    
+    cursor = cursores[-1]
+    after_ts, after_id = cursor if cursor else (None, None)
+    audit_df, siguiente = get_audit_page(after_ts, after_id, PAGE_SIZE, filters)
     
     if not audit_df.empty:
         st.dataframe(audit_df, use_container_width=True)
         
-        csv = audit_df.to_csv(index=False)
-        st.download_button("📥 Exportar CSV", csv, f"auditoria_{datetime.now().strftime('%Y%m%d')}.csv")
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Página {len(cursores)} · {len(audit_df)} registros")
+        with col3:
+            if st.button("Siguiente ➡️", disabled=siguiente is None, use_container_width=True):
+                cursores.append(siguiente)
+                st.rerun()
+        
+        show_export(filters)
     else:
         st.info("No hay registros")
+
+def show_export(filters):
+    """Exportar todo el rango filtrado (no solo la página) a un archivo temporal"""
+    st.subheader("📥 Exportar")
+    
+    formatos = ["CSV", "Parquet"] if PARQUET_AVAILABLE else ["CSV"]
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        formato = st.selectbox("Formato", formatos, key="audit_export_formato").lower()
+    with col2:
+        st.write("")
+        preparar = st.button("Preparar exportación", use_container_width=True)
+    
+    if not preparar:
+        return
+    
+    extension = 'csv' if formato == 'csv' else 'parquet'
+    fd, ruta = tempfile.mkstemp(prefix='auditoria_', suffix=f'.{extension}')
+    try:
+        with st.spinner("Exportando..."):
+            with os.fdopen(fd, 'wb') as archivo:
+                filas = exportar_auditoria(archivo, formato, filters)
+        
+        # download_button lee el archivo ahora; después ya no hace falta en disco
+        with open(ruta, 'rb') as archivo:
+            st.download_button(
+                f"📥 Descargar {filas} registros",
+                archivo,
+                f"auditoria_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                use_container_width=True
+            )
+    finally:
+        os.remove(ruta)
@@ -243,7 +243,7 @@ def show_inapp_config(config):
                 with col1:
                     status = "🔴 Nueva" if notif['read'] == 0 else "✅ Leída"
                     st.markdown(f"{notif['icon']} **{notif['title']}** - {status}")
-                    st.caption(notif['message'])
+                    st.caption(notif['message'].replace('\n', '  \n'))
                 
                 with col2:
                     st.caption(notif['timestamp'][:10])
@@ -2,37 +2,122 @@
 import streamlit as st
 from notifications.inapp import *
 
+PAGE_SIZE = 20
+
+def _linea(notif):
+    """Resumen de una notificación en una línea"""
+    agrupada = f" (×{notif['count']})" if notif.get('count', 1) > 1 else ""
+    nueva = " 🔴" if notif['read'] == 0 else ""
+    return f"{notif['icon']} {notif['title']}{agrupada}{nueva} · {str(notif['timestamp'])[:16].replace('T', ' ')}"
+
 def show_notifications_page():
     st.title("🔔 Notificaciones")
     
     username = st.session_state['username']
     
-    col1, col2 = st.columns([3, 1])
+    col1, col2, col3 = st.columns([2, 1, 1])
     with col2:
+        solo_no_leidas = st.toggle("Solo no leídas", key="notif_solo_no_leidas")
+    with col3:
         if st.button("Marcar todas como leídas"):
             mark_all_read(username)
             st.rerun()
     
-    notif_df = get_user_notifications(username)
-    
-    if not notif_df.empty:
-        for _, notif in notif_df.iterrows():
-            is_unread = notif['read'] == 0
-            
-            with st.container():
-                st.markdown(f"""
-                <div style='background: {"#fff3cd" if is_unread else "#f8f9fa"}; 
-                            padding: 1rem; border-radius: 8px; margin-bottom: 1rem;
-                            border-left: 4px solid {"#ffc107" if is_unread else "#6c757d"};'>
-                    <h4>{notif['icon']} {notif['title']} {"🔴" if is_unread else ""}</h4>
-                    <p>{notif['message']}</p>
-                    <small>{notif['timestamp']}</small>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if is_unread:
-                    if st.button("Marcar leída", key=f"read_{notif['id']}"):
-                        mark_notification_read(notif['id'])
-                        st.rerun()
-    else:
+    # Pila de cursores: el último es el inicio de la página actual
+    filtro = (username, solo_no_leidas)
+    if st.session_state.get('notif_filtro') != filtro:
+        st.session_state['notif_filtro'] = filtro
+        st.session_state['notif_cursores'] = [None]
+    cursores = st.session_state['notif_cursores']
+    
+    cursor = cursores[-1]
+    after_ts, after_id = cursor if cursor else (None, None)
+    notif_df, siguiente = get_notifications_page(
+        username, after_ts, after_id, PAGE_SIZE, unread_only=solo_no_leidas
+    )
+    
+    if notif_df.empty:
+        if len(cursores) > 1:
+            # La página quedó vacía (p. ej. se leyó todo lo filtrado): volver atrás
+            cursores.pop()
+            st.rerun()
         st.info("No tienes notificaciones")
+        return
+    
+    # Lista compacta: un solo control para toda la página; los botones
+    # de acción se crean únicamente para la notificación seleccionada
+    notificaciones = {int(notif['id']): notif for _, notif in notif_df.iterrows()}
+    seleccion = st.radio(
+        "Notificaciones",
+        list(notificaciones),
+        format_func=lambda notif_id: _linea(notificaciones[notif_id]),
+        label_visibility="collapsed",
+        key=f"notif_sel_{len(cursores)}"
+    )
+    
+    notif = notificaciones[seleccion]
+    is_unread = notif['read'] == 0
+    # Las agrupadas traen un mensaje por línea; en HTML el salto se pierde
+    mensaje_html = notif['message'].replace('\n', '<br>')
+    
+    with st.container():
+        st.markdown(f"""
+        <div style='background: {"#fff3cd" if is_unread else "#f8f9fa"};
+                    padding: 1rem; border-radius: 8px; margin-bottom: 1rem;
+                    border-left: 4px solid {"#ffc107" if is_unread else "#6c757d"};'>
+            <h4>{notif['icon']} {notif['title']} {f"(×{notif['count']})" if notif.get('count', 1) > 1 else ""} {"🔴" if is_unread else ""}</h4>
+            <p>{mensaje_html}</p>
+            <small>{notif['timestamp']}</small>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if is_unread:
+                if st.button("Marcar leída", key="notif_read"):
+                    mark_notification_read(notif['id'])
+                    st.rerun()
+        with col2:
+            if st.button("🗑️ Eliminar", key="notif_del"):
+                delete_notification(notif['id'])
+                st.rerun()
+    
+    # Acciones en lote sobre la página: una sola llamada al almacén
+    with st.expander("☑️ Selección múltiple"):
+        clave_lote = f"notif_lote_{len(cursores)}"
+        if st.button("Seleccionar toda la página", key="notif_lote_todo"):
+            st.session_state[clave_lote] = list(notificaciones)
+        elif clave_lote in st.session_state:
+            # Quitar las que ya no están en la página (borradas desde otro lado)
+            st.session_state[clave_lote] = [i for i in st.session_state[clave_lote] if i in notificaciones]
+        
+        seleccionadas = st.multiselect(
+            "Notificaciones seleccionadas",
+            list(notificaciones),
+            format_func=lambda notif_id: _linea(notificaciones[notif_id]),
+            key=clave_lote
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button(f"✓ Marcar leídas ({len(seleccionadas)})", disabled=not seleccionadas, key="notif_lote_read"):
+                mark_read_many(seleccionadas)
+                st.session_state.pop(clave_lote, None)
+                st.rerun()
+        with col2:
+            if st.button(f"🗑️ Eliminar ({len(seleccionadas)})", disabled=not seleccionadas, key="notif_lote_del"):
+                delete_many(seleccionadas)
+                st.session_state.pop(clave_lote, None)
+                st.rerun()
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️", disabled=len(cursores) == 1, key="notif_prev"):
+            cursores.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {len(cursores)}")
+    with col3:
+        if st.button("➡️", disabled=siguiente is None, key="notif_next"):
+            cursores.append(siguiente)
+            st.rerun()
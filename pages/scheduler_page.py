@@ -0,0 +1,91 @@
+"""Página de tareas programadas (estado y telemetría de los jobs)"""
+import streamlit as st
+from datetime import date, timedelta
+from auth.roles import require_role
+from notifications.job_metrics import get_job_runs, get_job_summary
+
+@require_role(['admin'])
+def show_scheduler_page():
+    st.title("⏱️ Tareas Programadas")
+    
+    show_jobs_status()
+    
+    st.markdown("---")
+    st.subheader("📈 Ejecuciones")
+    
+    dias = st.selectbox("Período", [7, 30, 90, 365], index=2, format_func=lambda d: f"Últimos {d} días")
+    desde = (date.today() - timedelta(days=dias)).isoformat()
+    
+    resumen = get_job_summary(desde)
+    if resumen.empty:
+        st.info("Todavía no hay ejecuciones registradas")
+        return
+    
+    st.dataframe(
+        resumen.rename(columns={
+            'job_id': 'Job',
+            'ejecuciones': 'Ejecuciones',
+            'fallos': 'Fallos',
+            'errores': 'Errores',
+            'duracion_media': 'Duración media (s)',
+            'duracion_max': 'Duración máx. (s)',
+            'procesados': 'Procesados',
+            'emails': 'Emails',
+            'whatsapps': 'WhatsApps',
+            'ultima': 'Última',
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    job_id = st.selectbox("Job", resumen['job_id'].tolist())
+    runs = get_job_runs(job_id, desde)
+    
+    if not runs.empty:
+        # Tendencia de duración: muestra cuándo un job se acerca a su ventana
+        tendencia = runs.sort_values('inicio').set_index('inicio')
+        st.caption("Duración por ejecución (s)")
+        st.line_chart(tendencia['duracion'])
+        st.caption("Ítems por ejecución")
+        st.line_chart(tendencia[['procesados', 'emails', 'whatsapps', 'errores']])
+        
+        fallidas = runs[runs['estado'] == 'error']
+        if not fallidas.empty:
+            with st.expander(f"❌ {len(fallidas)} ejecuciones fallidas"):
+                for _, run in fallidas.head(10).iterrows():
+                    st.markdown(f"**{run['inicio'][:16]}**")
+                    st.code(run['error'] or '', language=None)
+        
+        st.dataframe(
+            runs.drop(columns=['error']),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def show_jobs_status():
+    """Próximas ejecuciones y pausa/reanudación de los jobs"""
+    from notifications.scheduler import get_scheduler
+    
+    scheduler = get_scheduler()
+    if not scheduler.scheduler.running:
+        if scheduler.en_espera:
+            st.info("Otro proceso ejecuta los jobs; este queda en espera por si se detiene")
+        else:
+            st.info("El scheduler no está corriendo en este proceso")
+        return
+    
+    for job in scheduler.get_jobs_status():
+        col1, col2, col3 = st.columns([3, 2, 1])
+        with col1:
+            st.markdown(f"**{job['nombre']}**")
+            st.caption(job['trigger'])
+        with col2:
+            st.caption(f"Próxima: {job['próxima_ejecución']}")
+        with col3:
+            if job['próxima_ejecución'] == 'N/A':
+                if st.button("▶️", key=f"resume_{job['id']}", help="Reanudar"):
+                    scheduler.resume_job(job['id'])
+                    st.rerun()
+            elif st.button("⏸️", key=f"pause_{job['id']}", help="Pausar"):
+                scheduler.pause_job(job['id'])
+                st.rerun()
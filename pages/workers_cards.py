@@ -4,14 +4,16 @@ Página de trabajadores con diseño de cards (3 columnas) con fotos
 import streamlit as st
 import pandas as pd
 from database.workers_json import *
-from database.audit import log_action
+from database.audit import log_action, get_record_history
 from auth.roles import require_role
 import base64
+import json
 from io import BytesIO
 from PIL import Image
 from notifications.email_service import EmailService
 from notifications.templates import EmailTemplates
 from notifications.whatsapp_service import WhatsAppService
+from notifications.digest import get_email_digest
 
 def get_color_for_hours(total_horas, limite=40):
     """Obtener color según horas"""
@@ -154,8 +156,18 @@ def show_workers_cards_page():
             area_filter = st.selectbox("Filtrar por área", ["Todas"] + areas)
             area_filter = None if area_filter == "Todas" else area_filter
     
+    # Búsqueda por nombre, email, área o teléfono
+    busqueda = st.text_input(
+        "🔍 Buscar trabajador",
+        placeholder="Nombre, email, área o teléfono",
+        key="busqueda_trabajadores"
+    )
+    
     # Obtener trabajadores
-    trabajadores_df = obtener_trabajadores(area=area_filter)
+    if busqueda.strip():
+        trabajadores_df = buscar_trabajadores(busqueda, area=area_filter)
+    else:
+        trabajadores_df = obtener_trabajadores(area=area_filter)
     rubros_df = obtener_rubros()
     
     # Formulario agregar
@@ -273,7 +285,7 @@ def show_edit_modal(trabajador, rubros_df):
     st.markdown("---")
     st.subheader(f"Editando: {trabajador['nombre']}")
     
-    tabs = st.tabs(["📋 Info", "⏰ Horas", "📷 Foto", "📧 Notificar"])
+    tabs = st.tabs(["📋 Info", "⏰ Horas", "📷 Foto", "📧 Notificar", "🕓 Historial"])
     
     with tabs[0]:  # Info
         with st.form(f"edit_info_{trabajador['id']}"):
@@ -330,7 +342,10 @@ def show_edit_modal(trabajador, rubros_df):
                     )
                     
                     if resultado:
+                        campos = ['nombre', 'email', 'telefono', 'area']
                         log_action('UPDATE', 'trabajadores', trabajador['id'], 
+                                 old_value={k: trabajador.get(k) for k in campos},
+                                 new_value={'nombre': nombre, 'email': email, 'telefono': telefono, 'area': area},
                                  details=f"Actualizado {nombre}, área: {area}")
                         st.success(f"✅ Información de {nombre} actualizada correctamente")
                         st.info(f"📊 Área asignada: {area}")
@@ -421,9 +436,9 @@ def show_edit_modal(trabajador, rubros_df):
                             'horas': hora['horas']
                         })
                     
-                    # Enviar notificación con plantilla
+                    # Enviar notificación con plantilla; los guardados seguidos
+                    # se agrupan en un solo email con el estado final
                     try:
-                        email_service = EmailService()
                         templates = EmailTemplates()
                         html = templates.horas_asignadas(
                             trabajador['nombre'],
@@ -432,12 +447,18 @@ def show_edit_modal(trabajador, rubros_df):
                             2025
                         )
                         
-                        if email_service.send_email(
+                        digest = get_email_digest()
+                        if digest.encolar(
                             trabajador['email'],
                             f"Actualización de Horas - {trabajador['nombre']}",
-                            html
+                            html,
+                            clave=f"horas_{trabajador['id']}"
                         ):
-                            st.success(f"✅ Email enviado a {trabajador['email']}")
+                            if digest.window > 0:
+                                # Todavía no se envió: se informa en cola, no como enviado
+                                st.info(f"📨 Email en cola para {trabajador['email']}: se envía en {digest.window}s con los cambios agrupados")
+                            else:
+                                st.success(f"✅ Email enviado a {trabajador['email']}")
                         else:
                             st.warning("⚠️ No se pudo enviar el email")
                     except Exception as e:
@@ -469,6 +490,10 @@ def show_edit_modal(trabajador, rubros_df):
             if st.button("💾 Guardar", key=f"save_foto_{trabajador['id']}"):
                 foto_b64 = procesar_foto(nueva_foto)
                 if actualizar_trabajador(trabajador['id'], foto=foto_b64):
+                    log_action('UPDATE', 'trabajadores', trabajador['id'],
+                             old_value={'foto': trabajador.get('foto')},
+                             new_value={'foto': foto_b64},
+                             details=f"Foto actualizada {trabajador['nombre']}")
                     st.success("Foto actualizada")
                     st.rerun()
     
@@ -540,6 +565,75 @@ def show_edit_modal(trabajador, rubros_df):
                         st.error("❌ Error enviando WhatsApp")
             else:
                 st.warning("Sin teléfono configurado")
+    
+    with tabs[4]:  # Historial
+        # st.tabs ejecuta todas las pestañas al abrir el modal: el historial
+        # (que puede leer particiones archivadas) se consulta solo a pedido
+        clave_ver = f"historial_ver_{trabajador['id']}"
+        if st.session_state.get(clave_ver):
+            show_record_history(trabajador)
+        elif st.button("🕓 Ver historial", key=f"hist_ver_btn_{trabajador['id']}"):
+            st.session_state[clave_ver] = True
+            st.rerun()
+
+HISTORIAL_PAGE_SIZE = 10
+
+def _valor_legible(valor):
+    """Texto corto para un valor de auditoría (los blobs, p. ej. fotos, no se muestran)"""
+    if isinstance(valor, dict) and set(valor) == {'$blob'}:
+        return "[archivo]"
+    if valor is None or valor == '':
+        return "—"
+    return str(valor)
+
+def _describir_cambios(old_json, new_json):
+    """Líneas 'campo: antes → después' a partir del diff guardado en auditoría"""
+    antes = json.loads(old_json) if isinstance(old_json, str) else {}
+    despues = json.loads(new_json) if isinstance(new_json, str) else {}
+    if not (isinstance(antes, dict) and isinstance(despues, dict)):
+        return [f"{_valor_legible(antes)} → {_valor_legible(despues)}"]
+    
+    return [
+        f"**{campo}**: {_valor_legible(antes.get(campo))} → {_valor_legible(despues.get(campo))}"
+        for campo in list(antes) + [k for k in despues if k not in antes]
+    ]
+
+def show_record_history(trabajador):
+    """Entradas de auditoría del trabajador, paginadas por cursor"""
+    clave = f"historial_cursores_{trabajador['id']}"
+    if clave not in st.session_state:
+        st.session_state[clave] = [None]
+    cursores = st.session_state[clave]
+    
+    cursor = cursores[-1]
+    after_ts, after_id = cursor if cursor else (None, None)
+    historial_df, siguiente = get_record_history(
+        'trabajadores', trabajador['id'], after_ts, after_id, HISTORIAL_PAGE_SIZE
+    )
+    
+    if historial_df.empty:
+        st.info("Sin cambios registrados")
+        return
+    
+    for _, entrada in historial_df.iterrows():
+        fecha = str(entrada['timestamp'])[:16].replace('T', ' ')
+        st.markdown(f"**{entrada['action']}** · {fecha} · 👤 {entrada['username']}")
+        if pd.notna(entrada['details']):
+            st.caption(entrada['details'])
+        for linea in _describir_cambios(entrada['old_value'], entrada['new_value']):
+            st.markdown(f"- {linea}")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️", disabled=len(cursores) == 1, key=f"hist_prev_{trabajador['id']}"):
+            cursores.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {len(cursores)}")
+    with col3:
+        if st.button("➡️", disabled=siguiente is None, key=f"hist_next_{trabajador['id']}"):
+            cursores.append(siguiente)
+            st.rerun()
 
 def procesar_foto(uploaded_file):
     """Procesar y redimensionar foto"""
@@ -0,0 +1,460 @@
+"""
+Sincronización incremental bidireccional SQLite ⇄ JSON
+
+A diferencia de migrar_a_json.py (volcado completo en un sentido), este
+script copia solo los registros modificados desde la última sincronización:
+
+- SQLite → JSON: filas con fecha_modificacion (fecha_asignacion en horas)
+  posterior a la última marca.
+- JSON → SQLite: registros con `version` mayor a la última versión copiada
+  (ver database.workers_json.sellar_version). Los registros que escribió la
+  propia sincronización (`sincronizado` == `version`) no se devuelven.
+
+Cada backend asigna sus propios ids, así que trabajadores y rubros se
+emparejan con la tabla sync_ids (en trabajadores.db). Un registro aún sin
+pareja se vincula por identidad natural (email del trabajador, o su
+nombre si no tiene email; nombre del rubro) o se crea en el otro lado. Si
+esa identidad ya está vinculada a otro registro, el registro se omite con
+un aviso en lugar de sobrescribir a otra persona. Las horas se traducen a
+los ids de cada lado con la misma tabla.
+
+Las filas de SQLite se leen por lotes con fetchmany() y se escriben con
+executemany(), así la memoria no crece con el tamaño de la base. Si un
+registro cambió en ambos lados desde la última sincronización, gana JSON.
+Las eliminaciones físicas (hard delete) no se propagan; las bajas lógicas
+(estatus = 'inactivo') sí, porque son una modificación más.
+
+Uso:
+    python sincronizar.py                 # ambos sentidos
+    python sincronizar.py --solo json     # solo SQLite → JSON
+    python sincronizar.py --solo sqlite   # solo JSON → SQLite
+"""
+import argparse
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from database import workers
+from database import workers_json
+
+ESTADO_FILE = Path(__file__).parent / 'database' / 'sync_estado.json'
+TAMANO_LOTE = 500
+
+# Tabla SQLite → (columna de marca de tiempo, columnas que se sincronizan)
+TABLAS = {
+    'trabajadores': ('fecha_modificacion', ['id', 'nombre', 'email', 'telefono', 'area', 'foto', 'estatus']),
+    'rubros': ('fecha_modificacion', ['id', 'nombre', 'descripcion', 'activo']),
+    'horas_asignadas': ('fecha_asignacion', ['trabajador_id', 'rubro_id', 'horas', 'año']),
+}
+
+# Tabla → (funciones de lectura/escritura JSON)
+ARCHIVOS_JSON = {
+    'trabajadores': (workers_json.leer_trabajadores, workers_json.guardar_trabajadores),
+    'rubros': (workers_json.leer_rubros, workers_json.guardar_rubros),
+    'horas_asignadas': (workers_json.leer_horas, workers_json.guardar_horas),
+}
+
+# Tablas con ids propios en cada backend (emparejados en sync_ids)
+TABLAS_CON_ID = ('trabajadores', 'rubros')
+
+SYNC_IDS_SQL = '''
+    CREATE TABLE IF NOT EXISTS sync_ids (
+        tabla TEXT NOT NULL,
+        id_json INTEGER NOT NULL,
+        id_sqlite INTEGER NOT NULL,
+        PRIMARY KEY (tabla, id_json),
+        UNIQUE (tabla, id_sqlite)
+    )
+'''
+
+class ConflictoIdentidad(Exception):
+    """La identidad del registro ya está vinculada a otro registro del otro backend"""
+
+def _clave(tabla, registro):
+    """Clave del registro dentro de su propio backend"""
+    if tabla == 'horas_asignadas':
+        return (int(registro['trabajador_id']), int(registro['rubro_id']), int(registro['año']))
+    return int(registro['id'])
+
+def _identidad(tabla, registro):
+    """Identidad natural: email del trabajador (o su nombre si no tiene) y nombre del rubro"""
+    email = (registro.get('email') or '').strip().lower() if tabla == 'trabajadores' else ''
+    if email:
+        return ('email', email)
+    return ('nombre', (registro.get('nombre') or '').strip().lower())
+
+def leer_estado():
+    """Leer marcas de la última sincronización"""
+    if ESTADO_FILE.exists():
+        return json.loads(ESTADO_FILE.read_text(encoding='utf-8'))
+    return {'sqlite': {}, 'json': {}}
+
+def guardar_estado(estado):
+    """Guardar marcas de sincronización"""
+    ESTADO_FILE.write_text(json.dumps(estado, indent=2, ensure_ascii=False), encoding='utf-8')
+
+# ==================== IDS ====================
+
+class MapaIds:
+    """Correspondencia entre los ids SQLite y JSON de una tabla"""
+    
+    def __init__(self, conn, tabla, registros_json):
+        self.conn = conn
+        self.tabla = tabla
+        
+        columnas = 'id, nombre, email' if tabla == 'trabajadores' else 'id, nombre'
+        self.sqlite_por_id = {}
+        for fila in conn.execute(f"SELECT {columnas} FROM {tabla}"):
+            self.sqlite_por_id[fila[0]] = _identidad(tabla, dict(zip(('id', 'nombre', 'email'), fila)))
+        self.json_por_id = {int(r['id']): _identidad(tabla, r) for r in registros_json}
+        self.sqlite_por_identidad = {identidad: i for i, identidad in self.sqlite_por_id.items()}
+        self.json_por_identidad = {identidad: i for i, identidad in self.json_por_id.items()}
+        
+        # Vínculos guardados cuyos dos registros siguen existiendo
+        self._pendientes = []
+        self.json_a_sqlite = {}
+        self.sqlite_a_json = {}
+        for id_json, id_sqlite in conn.execute(
+            "SELECT id_json, id_sqlite FROM sync_ids WHERE tabla = ?", (tabla,)
+        ):
+            if id_json in self.json_por_id and id_sqlite in self.sqlite_por_id:
+                self.json_a_sqlite[id_json] = id_sqlite
+                self.sqlite_a_json[id_sqlite] = id_json
+    
+    def _resolver(self, id_origen, identidad, vinculos, vinculos_inversos, por_identidad):
+        if id_origen in vinculos:
+            return vinculos[id_origen]
+        id_destino = por_identidad.get(identidad)
+        if id_destino is None:
+            return None
+        if id_destino in vinculos_inversos:
+            raise ConflictoIdentidad(
+                f"{identidad[1]!r} ya está vinculado al registro {vinculos_inversos[id_destino]}"
+            )
+        return id_destino
+    
+    def id_sqlite(self, id_json, registro=None):
+        """Id SQLite del registro JSON (None si no existe allí)"""
+        identidad = _identidad(self.tabla, registro) if registro else self.json_por_id.get(id_json)
+        id_sqlite = self._resolver(
+            id_json, identidad, self.json_a_sqlite, self.sqlite_a_json, self.sqlite_por_identidad
+        )
+        if id_sqlite is not None:
+            self.vincular(id_json, id_sqlite)
+        return id_sqlite
+    
+    def id_json(self, id_sqlite, registro=None):
+        """Id JSON de la fila SQLite (None si no existe allí)"""
+        identidad = _identidad(self.tabla, registro) if registro else self.sqlite_por_id.get(id_sqlite)
+        id_json = self._resolver(
+            id_sqlite, identidad, self.sqlite_a_json, self.json_a_sqlite, self.json_por_identidad
+        )
+        if id_json is not None:
+            self.vincular(id_json, id_sqlite)
+        return id_json
+    
+    def vincular(self, id_json, id_sqlite, registro=None):
+        """Guardar el vínculo (y la identidad de un registro recién creado)"""
+        if registro is not None:
+            identidad = _identidad(self.tabla, registro)
+            self.sqlite_por_id.setdefault(id_sqlite, identidad)
+            self.json_por_id.setdefault(id_json, identidad)
+            self.sqlite_por_identidad.setdefault(identidad, id_sqlite)
+            self.json_por_identidad.setdefault(identidad, id_json)
+        if self.json_a_sqlite.get(id_json) == id_sqlite:
+            return
+        self._pendientes.append((self.tabla, id_json, id_sqlite))
+        self.json_a_sqlite[id_json] = id_sqlite
+        self.sqlite_a_json[id_sqlite] = id_json
+        if len(self._pendientes) >= TAMANO_LOTE:
+            self.guardar()
+    
+    def guardar(self):
+        """Escribir en sync_ids los vínculos nuevos
+        
+        Si el proceso se corta antes, la próxima sincronización los vuelve a
+        encontrar por identidad natural.
+        """
+        if not self._pendientes:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sync_ids (tabla, id_json, id_sqlite) VALUES (?, ?, ?)",
+                self._pendientes
+            )
+        self._pendientes = []
+
+def cargar_mapas(conn):
+    """MapaIds de trabajadores y rubros"""
+    conn.execute(SYNC_IDS_SQL)
+    return {
+        tabla: MapaIds(conn, tabla, ARCHIVOS_JSON[tabla][0]()[tabla])
+        for tabla in TABLAS_CON_ID
+    }
+
+def _traducir_horas(mapas, registro, hacia_sqlite):
+    """(trabajador_id, rubro_id) en los ids del otro backend, o None si falta alguno"""
+    ids = []
+    for tabla, columna in (('trabajadores', 'trabajador_id'), ('rubros', 'rubro_id')):
+        mapa = mapas[tabla]
+        try:
+            traducido = mapa.id_sqlite(int(registro[columna])) if hacia_sqlite else mapa.id_json(int(registro[columna]))
+        except ConflictoIdentidad:
+            traducido = None
+        if traducido is None:
+            return None
+        ids.append(traducido)
+    return tuple(ids)
+
+# ==================== JSON → SQLITE ====================
+
+def _sql_escritura(tabla):
+    """UPDATE por id (trabajadores, rubros) o upsert por clave natural (horas)"""
+    columna_fecha, columnas = TABLAS[tabla]
+    
+    if tabla == 'horas_asignadas':
+        todas = columnas + [columna_fecha]
+        return f'''
+            INSERT INTO {tabla} ({', '.join(todas)})
+            VALUES ({', '.join('?' for _ in todas)})
+            ON CONFLICT (trabajador_id, rubro_id, año) DO UPDATE SET
+            horas = excluded.horas, {columna_fecha} = excluded.{columna_fecha}
+        '''
+    
+    actualizar = [col for col in columnas if col != 'id'] + [columna_fecha]
+    return f'''
+        UPDATE {tabla} SET {', '.join(f'{col} = ?' for col in actualizar)}
+        WHERE id = ?
+    '''
+
+def _escribir_lote(conn, tabla, lote):
+    """Escribir un lote en SQLite; si falla (p. ej. email duplicado), fila por fila"""
+    query = _sql_escritura(tabla)
+    try:
+        with conn:
+            conn.executemany(query, lote)
+        return len(lote), 0
+    except sqlite3.IntegrityError:
+        escritos, errores = 0, 0
+        for fila in lote:
+            try:
+                with conn:
+                    conn.execute(query, fila)
+                escritos += 1
+            except sqlite3.IntegrityError as e:
+                print(f"   ⚠️ {tabla}: fila omitida {fila[:2]}: {e}")
+                errores += 1
+        return escritos, errores
+
+def _insertar_nuevo(conn, tabla, valores, fecha):
+    """Insertar un registro que no existe en SQLite; devuelve su id (None si falla)"""
+    columna_fecha, columnas = TABLAS[tabla]
+    nombres = [col for col in columnas if col != 'id'] + [columna_fecha]
+    try:
+        with conn:
+            c = conn.execute(
+                f"INSERT INTO {tabla} ({', '.join(nombres)}) VALUES ({', '.join('?' for _ in nombres)})",
+                tuple(valores) + (fecha,)
+            )
+        return c.lastrowid
+    except sqlite3.IntegrityError as e:
+        print(f"   ⚠️ {tabla}: registro omitido {valores[:1]}: {e}")
+        return None
+
+def json_a_sqlite(conn, tabla, desde_version, mapas):
+    """Copiar a SQLite los registros JSON con versión > desde_version
+    
+    Returns:
+        (claves SQLite copiadas, versión máxima del archivo)
+    """
+    columna_fecha, columnas = TABLAS[tabla]
+    leer, _ = ARCHIVOS_JSON[tabla]
+    data = leer()
+    ahora = datetime.now().isoformat()
+    
+    copiadas = set()
+    lote = []
+    errores = 0
+    
+    for registro in data[tabla]:
+        version = registro.get('version', 0)
+        if version <= desde_version or registro.get('sincronizado') == version:
+            continue
+        
+        if tabla == 'horas_asignadas':
+            ids = _traducir_horas(mapas, registro, hacia_sqlite=True)
+            if ids is None:
+                print(f"   ⚠️ {tabla}: registro {registro.get('id')} omitido (trabajador o rubro sin pareja en SQLite)")
+                errores += 1
+                continue
+            lote.append(ids + (registro.get('horas'), registro.get('año'), ahora))
+            copiadas.add(ids + (int(registro['año']),))
+        else:
+            valores = [registro.get(col) for col in columnas if col != 'id']
+            if tabla == 'rubros':
+                valores[columnas.index('activo') - 1] = 1 if registro.get('activo', True) else 0
+            
+            mapa = mapas[tabla]
+            try:
+                id_sqlite = mapa.id_sqlite(int(registro['id']), registro)
+            except ConflictoIdentidad as e:
+                print(f"   ⚠️ {tabla}: registro {registro['id']} omitido: {e}")
+                errores += 1
+                continue
+            
+            if id_sqlite is None:
+                id_sqlite = _insertar_nuevo(conn, tabla, valores, ahora)
+                if id_sqlite is None:
+                    errores += 1
+                    continue
+                mapa.vincular(int(registro['id']), id_sqlite, registro)
+            else:
+                lote.append(tuple(valores) + (ahora, id_sqlite))
+            copiadas.add(id_sqlite)
+        
+        if len(lote) >= TAMANO_LOTE:
+            errores += _escribir_lote(conn, tabla, lote)[1]
+            lote = []
+    
+    if lote:
+        errores += _escribir_lote(conn, tabla, lote)[1]
+    
+    print(f"   JSON → SQLite {tabla}: {len(copiadas)} registros ({errores} omitidos)")
+    return copiadas, data.get('version', 0)
+
+# ==================== SQLITE → JSON ====================
+
+def sqlite_a_json(conn, tabla, desde_fecha, mapas, omitir=()):
+    """Copiar a JSON las filas SQLite modificadas después de desde_fecha
+    
+    Las filas se recorren por lotes; `omitir` son claves SQLite que ya
+    vinieron de JSON en esta misma sincronización (JSON gana en conflictos).
+    """
+    columna_fecha, columnas = TABLAS[tabla]
+    leer, guardar = ARCHIVOS_JSON[tabla]
+    data = leer()
+    indice = {_clave(tabla, r): r for r in data[tabla]}
+    
+    query = f"SELECT {', '.join(columnas)} FROM {tabla}"
+    params = []
+    if desde_fecha:
+        query += f" WHERE {columna_fecha} > ?"
+        params.append(desde_fecha)
+    query += f" ORDER BY {columna_fecha}"
+    
+    c = conn.cursor()
+    c.execute(query, params)
+    
+    copiadas = 0
+    omitidas = 0
+    while True:
+        filas = c.fetchmany(TAMANO_LOTE)
+        if not filas:
+            break
+        
+        for fila in filas:
+            valores = dict(zip(columnas, fila))
+            if _clave(tabla, valores) in omitir:
+                continue
+            
+            nuevo_id = None
+            if tabla == 'horas_asignadas':
+                ids = _traducir_horas(mapas, valores, hacia_sqlite=False)
+                if ids is None:
+                    omitidas += 1
+                    continue
+                valores['trabajador_id'], valores['rubro_id'] = ids
+                valores['horas'] = float(valores['horas'])
+            else:
+                if tabla == 'rubros':
+                    valores['activo'] = bool(valores['activo']) if valores['activo'] is not None else True
+                
+                id_sqlite = valores['id']
+                try:
+                    id_json = mapas[tabla].id_json(id_sqlite, valores)
+                except ConflictoIdentidad as e:
+                    print(f"   ⚠️ {tabla}: fila {id_sqlite} omitida: {e}")
+                    omitidas += 1
+                    continue
+                if id_json is None:
+                    id_json = nuevo_id = data['next_id']
+                valores['id'] = id_json
+            
+            clave = _clave(tabla, valores)
+            registro = indice.get(clave)
+            if registro is None:
+                registro = valores
+                if tabla == 'horas_asignadas':
+                    registro = {'id': data['next_id'], **valores}
+                data[tabla].append(registro)
+                indice[clave] = registro
+            elif all(registro.get(col) == valor for col, valor in valores.items()):
+                # Sin cambios: no gastar una versión
+                continue
+            else:
+                registro.update(valores)
+            
+            data['next_id'] = max(data['next_id'], registro['id'] + 1)
+            workers_json.sellar_version(data, registro)
+            registro['sincronizado'] = registro['version']
+            if nuevo_id is not None:
+                mapas[tabla].vincular(nuevo_id, id_sqlite, registro)
+            copiadas += 1
+    
+    if copiadas:
+        guardar(data)
+    
+    print(f"   SQLite → JSON {tabla}: {copiadas} registros ({omitidas} omitidos)")
+    return data.get('version', 0)
+
+# ==================== ORQUESTACIÓN ====================
+
+def sincronizar(a_json=True, a_sqlite=True):
+    """Sincronizar ambos backends en los sentidos indicados"""
+    workers.init_workers_db()
+    workers_json.init_json_db()
+    
+    estado = leer_estado()
+    conn = sqlite3.connect(str(workers.DB_PATH))
+    mapas = cargar_mapas(conn)
+    
+    print("=" * 70)
+    print("SINCRONIZACIÓN INCREMENTAL SQLite ⇄ JSON")
+    print("=" * 70)
+    
+    for tabla in TABLAS:
+        copiadas = set()
+        
+        if a_sqlite:
+            copiadas, version_json = json_a_sqlite(conn, tabla, estado['json'].get(tabla, -1), mapas)
+            estado['json'][tabla] = version_json
+        
+        if a_json:
+            # Marca tomada antes de leer: lo que cambie durante la lectura
+            # entrará en la próxima sincronización. Los registros que se
+            # escriben aquí quedan marcados como `sincronizado` y la próxima
+            # copia JSON → SQLite los salta
+            marca = datetime.now().isoformat()
+            sqlite_a_json(conn, tabla, estado['sqlite'].get(tabla), mapas, omitir=copiadas)
+            estado['sqlite'][tabla] = marca
+        
+        for mapa in mapas.values():
+            mapa.guardar()
+    
+    conn.close()
+    guardar_estado(estado)
+    
+    print("\n✅ SINCRONIZACIÓN COMPLETADA")
+    print(f"   Estado guardado en: {ESTADO_FILE}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sincronización incremental SQLite ⇄ JSON")
+    parser.add_argument('--solo', choices=['json', 'sqlite'],
+                        help="Sincronizar en un solo sentido (destino)")
+    args = parser.parse_args()
+    
+    sincronizar(
+        a_json=args.solo in (None, 'json'),
+        a_sqlite=args.solo in (None, 'sqlite')
+    )
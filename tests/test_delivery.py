@@ -0,0 +1,100 @@
+"""Pruebas del envío concurrente de emails contra el proveedor local"""
+import threading
+from notifications.delivery import FakeEmailService, TokenBucket, entregar_emails
+
+def _envios(n):
+    return [(f'u{i}@x', 'Asunto', '<p>Hola</p>', f'user{i}') for i in range(n)]
+
+class RelojSimulado:
+    """Reloj para TokenBucket: dormir avanza el tiempo en vez de esperar"""
+    
+    def __init__(self):
+        self.ahora = 0.0
+        self._lock = threading.Lock()
+    
+    def __call__(self):
+        with self._lock:
+            return self.ahora
+    
+    def dormir(self, segundos):
+        with self._lock:
+            self.ahora += segundos
+
+class ProveedorConTiempos(FakeEmailService):
+    """FakeEmailService que anota el momento (según `reloj`) de cada envío"""
+    
+    def __init__(self, reloj, **kwargs):
+        super().__init__(**kwargs)
+        self.reloj = reloj
+        self.tiempos = []
+    
+    def send_email(self, to_email, subject, body_html, attachments=None):
+        with self._lock:
+            self.tiempos.append(self.reloj())
+        return super().send_email(to_email, subject, body_html, attachments)
+
+class ProveedorQueFalla(FakeEmailService):
+    """FakeEmailService que lanza una excepción para `to_email` en `explotar`"""
+    
+    def __init__(self, explotar=(), **kwargs):
+        super().__init__(**kwargs)
+        self.explotar = set(explotar)
+    
+    def send_email(self, to_email, subject, body_html, attachments=None):
+        if to_email in self.explotar:
+            raise ConnectionError('SMTP caído')
+        return super().send_email(to_email, subject, body_html, attachments)
+
+def test_token_bucket_rafaga_y_tasa():
+    reloj = RelojSimulado()
+    bucket = TokenBucket(20, 5, reloj=reloj, dormir=reloj.dormir)
+    
+    tiempos = []
+    for _ in range(25):
+        bucket.adquirir()
+        tiempos.append(reloj())
+    
+    # La ráfaga sale de inmediato; los 20 restantes a 20 por segundo
+    assert tiempos[:5] == [0.0] * 5
+    for i, t in enumerate(tiempos[5:], start=1):
+        assert abs(t - i / 20) < 1e-9
+
+def test_respeta_tasa_y_rafaga():
+    reloj = RelojSimulado()
+    bucket = TokenBucket(20, 5, reloj=reloj, dormir=reloj.dormir)
+    proveedor = ProveedorConTiempos(reloj)
+    
+    resultado = entregar_emails(_envios(25), proveedor, max_workers=8, bucket=bucket)
+    
+    assert resultado['enviados'] == 25
+    # Con varios hilos el reloj puede avanzar de más, nunca de menos
+    tiempos = sorted(proveedor.tiempos)
+    assert sum(1 for t in tiempos if t == 0) <= 5
+    for i, t in enumerate(tiempos[5:], start=1):
+        assert t >= i / 20 - 1e-9
+
+def test_un_fallo_no_afecta_a_los_demas():
+    proveedor = ProveedorQueFalla(explotar={'u3@x'}, fallar={'u1@x'})
+    
+    resultado = entregar_emails(_envios(10), proveedor, rate=0)
+    
+    assert resultado['enviados'] == 8
+    assert resultado['fallidos'] == 2
+    assert sorted(to for to, _ in resultado['errores']) == ['u1@x', 'u3@x']
+    assert dict(resultado['errores'])['u3@x'] == 'SMTP caído'
+    assert len(proveedor.enviados) == 8
+
+def test_al_enviar_solo_para_envios_exitosos():
+    proveedor = ProveedorQueFalla(explotar={'u2@x'}, fallar={'u0@x'})
+    registrados = []
+    
+    entregar_emails(_envios(5), proveedor, rate=0, al_enviar=registrados.append)
+    
+    assert sorted(registrados) == ['user1', 'user3', 'user4']
+
+def test_al_enviar_usa_el_email_sin_clave():
+    registrados = []
+    
+    entregar_emails([('a@x', 'Asunto', '<p>Hola</p>')], FakeEmailService(), rate=0, al_enviar=registrados.append)
+    
+    assert registrados == ['a@x']